@@ -14,13 +14,14 @@
  - Progress bar per folder
  - Fully user-customizable: root folder, Excel filename, PDF path, column name
  Author:          Akshay Solanki
- Dependencies:    pandas, PyPDF2, openpyxl, tqdm, os
+ Dependencies:    pandas, pikepdf, openpyxl, tqdm, os
 ===============================================================================
 """
 
 import pandas as pd
-import PyPDF2
+import pikepdf
 import os
+import sys
 from tqdm import tqdm
 
 # ==============================
@@ -44,19 +45,8 @@ def log_error(msg):
     with open(log_file, 'a') as f:
         f.write(msg + "\n")
 
-def extract_pages(pdf_path, page_numbers, folder_path):
-    """Extract pages from PDF and save in the specified folder"""
-    try:
-        pdf_reader = PyPDF2.PdfReader(pdf_path)
-    except FileNotFoundError:
-        log_error(f"PDF file not found: {pdf_path}")
-        return
-    except Exception as e:
-        log_error(f"Failed to load PDF '{pdf_path}': {e}")
-        return
-
-    total_pages = len(pdf_reader.pages)
-
+def extract_pages(source_pdf, total_pages, page_numbers, folder_path):
+    """Extract pages from the shared source PDF and save in the specified folder"""
     # Already extracted pages in the folder
     already_extracted = set(
         int(f.split('.')[0]) for f in os.listdir(folder_path)
@@ -74,20 +64,34 @@ def extract_pages(pdf_path, page_numbers, folder_path):
                 log_error(f"Page number {page_num} out of range in PDF '{pdf_path}'")
                 continue
 
-            pdf_writer = PyPDF2.PdfWriter()
-            page = pdf_reader.pages[page_num - 1]
-            pdf_writer.add_page(page)
+            output_pdf_path = os.path.join(folder_path, f"{page_num}.pdf")
+            with pikepdf.Pdf.new() as out:
+                out.pages.append(source_pdf.pages[page_num - 1])
 
-            # Optional: attempt A3 landscape
-            page.mediabox.upper_right = (1191, 842)
+                # Optional: attempt A3 landscape (on the written copy, not the shared source page)
+                page = out.pages[0]
+                llx, lly = page.mediabox[0], page.mediabox[1]
+                page.mediabox = pikepdf.Array([llx, lly, 1191, 842])
 
-            output_pdf_path = os.path.join(folder_path, f"{page_num}.pdf")
-            with open(output_pdf_path, 'wb') as f:
-                pdf_writer.write(f)
+                out.save(output_pdf_path, linearize=False, compress_streams=True,
+                         object_stream_mode=pikepdf.ObjectStreamMode.generate)
 
         except Exception as e:
             log_error(f"Failed to extract page {page_num} from '{pdf_path}': {e}")
 
+# ==============================
+# LOAD PDF ONCE (shared by all folders)
+# ==============================
+try:
+    source_pdf = pikepdf.Pdf.open(pdf_path)
+    total_pages = len(source_pdf.pages)
+except FileNotFoundError:
+    log_error(f"PDF file not found: {pdf_path}")
+    sys.exit(1)
+except Exception as e:
+    log_error(f"Failed to load PDF '{pdf_path}': {e}")
+    sys.exit(1)
+
 # ==============================
 # ITERATE THROUGH SUBFOLDERS
 # ==============================
@@ -132,6 +136,6 @@ for subdir, dirs, files in os.walk(root_folder):
 
     # Extract pages with progress bar
     for _ in tqdm([pdf_path], desc=f"Processing PDF for folder '{subdir}'"):
-        extract_pages(pdf_path, page_numbers, folder_path)
+        extract_pages(source_pdf, total_pages, page_numbers, folder_path)
 
 print("\n🎉 Iterative incremental extraction complete. All errors logged in 'log_errors.txt'.")
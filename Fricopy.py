@@ -67,8 +67,9 @@ def create_linewise_index(root_path):
     
     for subdir, _, files in os.walk(root_path):
         for linewise_file in files:
-            if linewise_file.lower().endswith(".pdf"):
-                search_key = os.path.splitext(linewise_file)[0].lower()
+            name_lower = linewise_file.lower()
+            if name_lower.endswith(".pdf"):
+                search_key = os.path.splitext(name_lower)[0]
                 full_path = os.path.join(subdir, linewise_file)
                 linewise_index[search_key].append((full_path, linewise_file))
     
@@ -69,9 +69,10 @@ output_excel_name = "output.xlsx"
 iso_page_map = {}
 
 try:
-    with open(index_file_path, 'r', encoding='utf-8', errors='ignore') as f:
+    # 1 MiB read buffer; only the first two fields of each line are needed
+    with open(index_file_path, 'r', encoding='utf-8', errors='ignore', buffering=1 << 20) as f:
         for line in f:
-            parts = line.strip().split()
+            parts = line.split(None, 2)
             if len(parts) >= 2 and parts[0].lower() == "pid_4.pdf":
                 try:
                     page_number = int(parts[1])
@@ -85,6 +86,10 @@ except FileNotFoundError:
 if not iso_page_map.get("pid_4.pdf"):
     print("⚠️ No page numbers found in index file. Ensure PDFs are indexed for fast processing.")
 
+# Every ISO gets the same page list, so sort/dedupe it once here
+page_numbers = iso_page_map.get("pid_4.pdf", [])
+page_str = ",".join(str(p) for p in sorted(set(page_numbers))) if page_numbers else None
+
 # ==============================
 # Step 2: Regex to extract ISO from PDF filename
 # ==============================
@@ -154,27 +159,12 @@ for idx, subdir in enumerate(tqdm(subdirs, desc="Processing folders")):
     # ==============================
     # Step 4b: Map PDF pages
     # ==============================
-    pdf_pages = []
-    for iso in new_isos:
-        page_numbers = iso_page_map.get("pid_4.pdf", [])
-        page_str = ",".join(str(p) for p in sorted(set(page_numbers))) if page_numbers else ""
-        pdf_pages.append(page_str)
-
-    # Create DataFrame for new ISOs
+    # Create DataFrame for new ISOs (PDF PAGE is already a clean "1,2,3" list)
     df_new = pd.DataFrame({
         "ISO LIST": new_isos,
-        "PDF PAGE": pdf_pages
+        "PDF PAGE": [page_str] * len(new_isos)
     })
 
-    # Force numeric format for PDF PAGE
-    def format_numeric(cell):
-        if not cell:
-            return None
-        nums = [int(n) for n in cell.split(",") if n.isdigit()]
-        return ",".join(str(n) for n in nums)
-
-    df_new["PDF PAGE"] = df_new["PDF PAGE"].apply(format_numeric)
-
     # Merge with existing Excel if present
     if existing_iso_list:
         df_final = pd.concat([df_existing, df_new], ignore_index=True)
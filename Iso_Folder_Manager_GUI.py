@@ -15,74 +15,186 @@
     8. ADDED PROGRESS TRACKING using tqdm
  Author:          Akshay Solanki
  Created On:      19-Oct-2025
- Dependencies:    pandas, openpyxl, tkinter, os, shutil, datetime, tqdm
+ Dependencies:    pandas, openpyxl, python-calamine (optional), tkinter, os, shutil, datetime, tqdm
 ===============================================================================
 """
 
 import os
+import sys
+import atexit
+import errno
+import ctypes
 import shutil
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
 from tqdm import tqdm
 
+# python-calamine (Rust) reads .xlsx far faster than openpyxl; fall back if absent
+# or if pandas is too old (< 2.2) to know engine="calamine"
+try:
+    import python_calamine  # noqa: F401
+    if tuple(int(part) for part in pd.__version__.split(".")[:2]) < (2, 2):
+        raise ImportError("pandas < 2.2 has no calamine engine")
+    EXCEL_READ_ENGINE = "calamine"
+except ImportError:
+    EXCEL_READ_ENGINE = "openpyxl"
+
+COPY_WORKERS = 8  # Parallel ISO copies; overlaps network latency on the server share
+
+# Log files stay open for the whole run (buffered), instead of one open() per line.
+# Only the main thread logs; copy workers hand their results back to it.
+_LOG_HANDLES = {}
+
 def log(msg: str, log_file):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{timestamp}] {msg}"
     print(line)
     try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
+        fh = _LOG_HANDLES.get(log_file)
+        if fh is None:
+            fh = open(log_file, "a", encoding="utf-8", buffering=65536)
+            atexit.register(fh.close)
+            _LOG_HANDLES[log_file] = fh
+        fh.write(line + "\n")
     except Exception as e:
         print(f"ERROR: Could not write to log file: {e}")
 
-def safe_copy(src, dest):
-    if not os.path.exists(src):
-        raise FileNotFoundError(src)
-    dest_dir = os.path.dirname(dest)
-    os.makedirs(dest_dir, exist_ok=True)
-    base, ext = os.path.splitext(dest)
-    if os.path.exists(dest) and os.path.getsize(src) == os.path.getsize(dest):
+def flush_log(log_file):
+    fh = _LOG_HANDLES.get(log_file)
+    if fh is not None:
+        fh.flush()
+
+# Kernel-side copy: copy_file_range (reflink / NFS server-side copy) -> sendfile
+# -> 1 MiB readinto loop. On Windows CopyFile2 does CoW / SMB server-side copy.
+COPY_CHUNK = 1 << 30
+COPY_BUFSIZE = 1 << 20
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                         errno.ENOTSUP, errno.ENOTSOCK, errno.EBADF, errno.EPERM}
+
+def copy_fd(src_fd, dst_fd, size):
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                n = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK)
+                if n == 0:
+                    break
+                offset += n
+            if offset or not size:
+                return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while True:
+                n = os.sendfile(dst_fd, src_fd, offset, COPY_CHUNK)
+                if n == 0:
+                    break
+                offset += n
+            if offset >= size:
+                return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buf = bytearray(COPY_BUFSIZE)
+    view = memoryview(buf)
+    while True:
+        n = os.readv(src_fd, [buf])
+        if n == 0:
+            break
+        written = 0
+        while written < n:
+            written += os.write(dst_fd, view[written:n])
+
+def _copy_file2(src, dest):
+    copy_file2 = getattr(ctypes.windll.kernel32, "CopyFile2", None)
+    if copy_file2 is None:
+        return False
+    copy_file2.argtypes = (ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_void_p)
+    copy_file2.restype = ctypes.c_long
+    return copy_file2(os.path.abspath(src), os.path.abspath(dest), None) == 0
+
+def fast_copy(src, dest, src_stat=None):
+    if sys.platform == "win32":
+        if not _copy_file2(src, dest):
+            shutil.copy2(src, dest)
+        return
+    st = src_stat or os.stat(src)
+    cloexec = getattr(os, "O_CLOEXEC", 0)
+    src_fd = os.open(src, os.O_RDONLY | cloexec)
+    try:
+        dst_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | cloexec, st.st_mode & 0o777)
+        try:
+            copy_fd(src_fd, dst_fd, st.st_size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+def ensure_dir(path, ensured_dirs=None):
+    # makedirs once per directory; ensured_dirs remembers it and its parents
+    if ensured_dirs is None:
+        os.makedirs(path, exist_ok=True)
+        return
+    if path in ensured_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    while path not in ensured_dirs:
+        ensured_dirs.add(path)
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+def safe_copy(src, dest, ensured_dirs=None):
+    # One stat per side; a missing src raises FileNotFoundError as before
+    src_stat = os.stat(src)
+    ensure_dir(os.path.dirname(dest), ensured_dirs)
+    try:
+        if os.stat(dest).st_size == src_stat.st_size:
+            return dest
+    except FileNotFoundError:
+        fast_copy(src, dest, src_stat)
         return dest
-    candidate = dest
+    base, ext = os.path.splitext(dest)
     i = 1
+    candidate = f"{base}_dup{i}{ext}"
     while os.path.exists(candidate):
-        candidate = f"{base}_dup{i}{ext}"
         i += 1
-    shutil.copy2(src, candidate)
+        candidate = f"{base}_dup{i}{ext}"
+    fast_copy(src, candidate, src_stat)
     return candidate
 
-def make_folder_name(loop_no: str, system_no: str) -> str:
-    loop_no = str(loop_no).strip()
-    system_no = str(system_no).strip()
-    return f"{loop_no}_{system_no}"
+def make_folder_names(loop_no: pd.Series, system_no: pd.Series) -> pd.Series:
+    return loop_no.str.strip().str.cat(system_no.str.strip(), sep="_")
 
-def find_iso_on_server(iso_no: str, server_path: str) -> str:
-    if not iso_no or not isinstance(iso_no, str):
-        return ""
-    iso_no = iso_no.strip()
-    
-    # Search for files matching pattern: *({iso_no}).pdf
-    if os.path.isdir(server_path):
-        try:
-            for item in os.listdir(server_path):
-                if item.lower().endswith(".pdf"):
-                    # Extract text in parenthesis: filename(abc-def).pdf -> abc-def
-                    if "(" in item and ")" in item:
-                        start = item.rfind("(")
-                        end = item.rfind(")")
-                        if start < end:
-                            extracted = item[start+1:end]
-                            if extracted.lower() == iso_no.lower():
-                                full_path = os.path.join(server_path, item)
-                                if os.path.isfile(full_path):
-                                    return full_path
-        except PermissionError:
-            pass
-    return ""
+def build_iso_index(server_path: str) -> dict:
+    # One directory scan: ISO no (text in the last parentheses, lower-cased) -> full path
+    # e.g. filename(abc-def).pdf -> {"abc-def": ".../filename(abc-def).pdf"}
+    index = {}
+    try:
+        with os.scandir(server_path) as entries:
+            for entry in entries:
+                item = entry.name
+                if not item.lower().endswith(".pdf"):
+                    continue
+                start = item.rfind("(")
+                end = item.rfind(")")
+                if -1 < start < end and entry.is_file():
+                    index.setdefault(item[start+1:end].lower(), entry.path)
+    except OSError:
+        pass
+    return index
 
 def create_or_update_excel(excel_file, log_file):
     headers = ["Iso no", "loop no", "system no", "folder name", "history folder name", "ISO Status"]
@@ -94,161 +206,241 @@ def create_or_update_excel(excel_file, log_file):
         messagebox.showinfo("Excel Created", f"Excel created:\n{excel_file}\n\nFill first three columns (Iso no, loop no, system no).")
         return
         
-    df = pd.read_excel(excel_file, dtype=str).fillna("")
+    df = pd.read_excel(excel_file, dtype=str, engine=EXCEL_READ_ENGINE).fillna("")
     for col in headers:
         if col not in df.columns:
             df[col] = ""
     df = df[headers]
-    for idx, row in df.iterrows():
-        new_folder_name = make_folder_name(row["loop no"], row["system no"])
-        df.at[idx, "folder name"] = new_folder_name
-        if not row["history folder name"]:
-            df.at[idx, "history folder name"] = new_folder_name
+    df["folder name"] = make_folder_names(df["loop no"], df["system no"])
+    df["history folder name"] = df["history folder name"].mask(df["history folder name"] == "", df["folder name"])
     df.to_excel(excel_file, index=False)
     log(f"Excel normalized: {excel_file}", log_file)
     messagebox.showinfo("Excel Ready", f"Excel ready:\n{excel_file}")
 
-def highlight_missing_iso(excel_file, log_file):
+# Built once and shared by every styled cell
+RED_FILL = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
+HEADER_FONT = Font(bold=True)
+
+def save_excel_with_highlight(df, excel_file, log_file):
+    # Single streamed write (openpyxl write-only mode): MISSING rows get the
+    # red fill as they are written, so the file is never reopened to style it.
+    if "ISO Status" in df.columns:
+        missing = (df["ISO Status"].str.strip().str.upper() == "MISSING").tolist()
+    else:
+        missing = [False] * len(df)
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = HEADER_FONT
+        header.append(cell)
+    ws.append(header)
+    
+    for values, is_missing in zip(df.itertuples(index=False, name=None), missing):
+        values = [v if v != "" else None for v in values]
+        if is_missing:
+            cells = []
+            for v in values:
+                cell = WriteOnlyCell(ws, value=v)
+                cell.fill = RED_FILL
+                cells.append(cell)
+            values = cells
+        ws.append(values)
+    
+    wb.save(excel_file)
+    log(f"Excel saved: {excel_file} ({sum(missing)} MISSING rows highlighted)", log_file)
+
+def write_placeholder(dest_folder, iso_no, ensured_dirs=None):
+    ensure_dir(dest_folder, ensured_dirs)
+    # Raw fd write: no text/buffer layers for a one-line file (same bytes as text mode)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(os.path.join(dest_folder, "ISO_NOT_FOUND.txt"), flags, 0o644)
     try:
-        wb = load_workbook(excel_file)
-        ws = wb.active
-        red_fill = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
-        clear_fill = PatternFill(fill_type=None)
-        
-        header = [cell.value for cell in ws[1]]
-        if "ISO Status" not in header:
-            return
-        
-        col_idx = header.index("ISO Status") + 1
-        for row in range(2, ws.max_row + 1):
-            cell = ws.cell(row=row, column=col_idx)
-            status_val = str(cell.value).strip().upper() if cell.value else ""
-            fill = red_fill if status_val == "MISSING" else clear_fill
-            for c in range(1, ws.max_column + 1):
-                ws.cell(row=row, column=c).fill = fill
-        
-        wb.save(excel_file)
-        log("Excel highlighting applied.", log_file)
-    except Exception as e:
-        log(f"ERROR applying highlighting: {e}", log_file)
+        os.write(fd, f"ISO {iso_no} not found.{os.linesep}".encode())
+    finally:
+        os.close(fd)
 
 def sync_folders_and_copy(excel_file, server_path, dest_root, log_file):
     if not os.path.exists(excel_file):
         messagebox.showerror("Error", "Excel not found.")
         return
         
-    df = pd.read_excel(excel_file, dtype=str).fillna("")
-    for idx, row in df.iterrows():
-        df.at[idx, "folder name"] = make_folder_name(row["loop no"], row["system no"])
+    df = pd.read_excel(excel_file, dtype=str, engine=EXCEL_READ_ENGINE).fillna("")
+    df["folder name"] = make_folder_names(df["loop no"], df["system no"])
 
     processed_folders = {}
+    history_remap = {}
+    history_updates = {}
+    ensured_dirs = set()
     
     log("--- Starting Folder Structure Sync (Phase 1/2) ---", log_file)
-    for idx, row in df.iterrows():
-        desired = row["folder name"].strip()
-        history = row["history folder name"].strip()
+    rows = df[["folder name", "history folder name"]].itertuples(index=True, name=None)
+    for idx, desired, history in rows:
+        desired = desired.strip()
+        history = history.strip()
         if not desired or not history:
             continue
         
         key = (history, desired)
         if key in processed_folders:
-            df.at[idx, "history folder name"] = desired
+            history_updates[idx] = desired
             continue
         
         desired_path = os.path.join(dest_root, desired)
         history_path = os.path.join(dest_root, history)
         
         try:
-            if history != desired and os.path.exists(history_path):
-                if not os.path.exists(desired_path):
+            moved = False
+            if history != desired:
+                # Try the rename and let the OS say which case this is, rather than stat both paths first
+                try:
                     os.rename(history_path, desired_path)
                     log(f"RENAMED: {history} -> {desired}", log_file)
-                else:
-                    for f_name in os.listdir(history_path):
-                        srcf = os.path.join(history_path, f_name)
-                        dstf = os.path.join(desired_path, f_name)
-                        if os.path.exists(dstf) and os.path.isfile(srcf):
-                            safe_copy(srcf, dstf)
-                            try:
-                                os.remove(srcf)
-                            except OSError:
-                                pass
-                        elif not os.path.exists(dstf):
-                            shutil.move(srcf, dstf)
-                            log(f"MOVED {f_name}: {history} -> {desired}", log_file)
+                    moved = True
+                except FileNotFoundError:
+                    pass  # no history folder left to move
+                except OSError as e:
+                    # Desired folder already exists (EEXIST on Windows, ENOTEMPTY on POSIX): merge into it
+                    if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                        raise
+                    moved = True
+                    with os.scandir(history_path) as it:
+                        entries = list(it)
+                    for entry in entries:
+                        dstf = os.path.join(desired_path, entry.name)
+                        if os.path.exists(dstf):
+                            if entry.is_file():
+                                safe_copy(entry.path, dstf)
+                                try:
+                                    os.remove(entry.path)
+                                except OSError:
+                                    pass
+                            continue
+                        # Same volume: a plain rename, no data copied
+                        try:
+                            os.replace(entry.path, dstf)
+                        except OSError:
+                            shutil.move(entry.path, dstf)
+                        log(f"MOVED {entry.name}: {history} -> {desired}", log_file)
                     
                     try:
                         os.rmdir(history_path)
                         log(f"DELETED empty folder: {history}", log_file)
                     except OSError:
                         log(f"Folder not empty: {history}", log_file)
-                
-                df.loc[df["history folder name"] == history, "history folder name"] = desired
+            
+            if moved:
+                history_remap[history] = desired
                 processed_folders[key] = True
+                ensured_dirs.discard(history_path)
 
-            if not os.path.exists(desired_path):
-                os.makedirs(desired_path, exist_ok=True)
-                log(f"CREATED folder: {desired}", log_file)
+            if desired_path not in ensured_dirs:
+                try:
+                    os.mkdir(desired_path)
+                    log(f"CREATED folder: {desired}", log_file)
+                except FileExistsError:
+                    pass
+                ensured_dirs.add(desired_path)
             
-            df.at[idx, "history folder name"] = desired
+            history_updates[idx] = desired
         except Exception as e:
             log(f"ERROR row {idx}: {e}", log_file)
 
+    if history_updates:
+        df.loc[list(history_updates), "history folder name"] = list(history_updates.values())
+    # Point any remaining rows at renamed folders in one pass
+    if history_remap:
+        df["history folder name"] = df["history folder name"].replace(history_remap)
+
+    flush_log(log_file)
     log("--- Starting ISO Copy Phase (Phase 2/2) ---", log_file)
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="Copying ISOs", ncols=80):
-        iso_no = row["Iso no"].strip()
-        folder = row["folder name"].strip()
+    iso_index = build_iso_index(server_path)
+    # Rows sharing the same destination file are copied once; each folder
+    # with a missing ISO gets one placeholder (last row wins, as before).
+    copy_jobs = {}
+    placeholders = {}
+    missing_idxs = []
+    rows = df[["Iso no", "folder name"]].itertuples(index=True, name=None)
+    for idx, iso_no, folder in rows:
+        iso_no = iso_no.strip()
+        folder = folder.strip()
         dest_folder = os.path.join(dest_root, folder)
         
         if not folder or not iso_no:
             continue
         
-        src_iso = find_iso_on_server(iso_no, server_path)
+        src_iso = iso_index.get(iso_no.lower(), "")
         
         if not src_iso:
-            os.makedirs(dest_folder, exist_ok=True)
-            with open(os.path.join(dest_folder, "ISO_NOT_FOUND.txt"), "w") as f:
-                f.write(f"ISO {iso_no} not found.\n")
-            df.at[idx, "ISO Status"] = "MISSING"
+            placeholders[dest_folder] = iso_no
+            missing_idxs.append(idx)
             log(f"MISSING ISO: {iso_no} (row {idx})", log_file)
             continue
         
         dest_iso = os.path.join(dest_folder, os.path.basename(src_iso))
-        try:
-            safe_copy(src_iso, dest_iso)
-            df.at[idx, "ISO Status"] = "OK"
-            log(f"COPIED: {iso_no} -> {folder}", log_file)
-        except Exception as e:
-            log(f"ERROR copying {iso_no}: {e}", log_file)
-            df.at[idx, "ISO Status"] = "MISSING"
+        copy_jobs.setdefault(dest_iso, (src_iso, iso_no, folder, []))[3].append(idx)
+    df.loc[missing_idxs, "ISO Status"] = "MISSING"
 
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        placeholder_futures = {pool.submit(write_placeholder, dest_folder, iso_no, ensured_dirs): dest_folder
+                               for dest_folder, iso_no in placeholders.items()}
+        # Submitted folder by folder, so consecutive copies share their directory
+        futures = {pool.submit(safe_copy, src_iso, dest_iso, ensured_dirs): (iso_no, folder, idxs)
+                   for dest_iso, (src_iso, iso_no, folder, idxs) in sorted(copy_jobs.items())}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Copying ISOs", ncols=80):
+            iso_no, folder, idxs = futures[future]
+            try:
+                future.result()
+                df.loc[idxs, "ISO Status"] = "OK"
+                log(f"COPIED: {iso_no} -> {folder}", log_file)
+            except Exception as e:
+                log(f"ERROR copying {iso_no}: {e}", log_file)
+                df.loc[idxs, "ISO Status"] = "MISSING"
+        for future, dest_folder in placeholder_futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                log(f"ERROR writing placeholder in {dest_folder}: {e}", log_file)
+
+    flush_log(log_file)
     log("--- Starting Destination Cleanup ---", log_file)
     try:
-        existing = set(os.listdir(dest_root))
-        excel_folders = set(df["folder name"].tolist())
-        for folder in existing:
-            path = os.path.join(dest_root, folder)
-            if folder not in excel_folders and os.path.isdir(path) and not os.listdir(path):
-                try:
-                    os.rmdir(path)
-                    log(f"DELETED empty: {folder}", log_file)
-                except Exception as e:
-                    log(f"ERROR deleting {folder}: {e}", log_file)
+        excel_folders = set(df["folder name"])
+        with os.scandir(dest_root) as it:
+            candidates = [e for e in it if e.name not in excel_folders and e.is_dir(follow_symlinks=False)]
+        for entry in candidates:
+            # rmdir itself refuses non-empty folders; no need to list them first
+            try:
+                os.rmdir(entry.path)
+                log(f"DELETED empty: {entry.name}", log_file)
+            except OSError as e:
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    log(f"ERROR deleting {entry.name}: {e}", log_file)
     except Exception as e:
         log(f"ERROR cleanup: {e}", log_file)
 
-    df.to_excel(excel_file, index=False)
-    highlight_missing_iso(excel_file, log_file)
+    save_excel_with_highlight(df, excel_file, log_file)
+    flush_log(log_file)
     messagebox.showinfo("Done", "Sync complete. Check log for details.")
 
+_TK_ROOT = None
+
+def get_tk_root():
+    # One hidden Tk interpreter, reused by every dialog and message box
+    global _TK_ROOT
+    if _TK_ROOT is None:
+        _TK_ROOT = tk.Tk()
+        _TK_ROOT.withdraw()
+        atexit.register(_TK_ROOT.destroy)
+    return _TK_ROOT
+
 def select_folder(title="Select folder"):
-    root = tk.Tk()
-    root.withdraw()
-    folder = filedialog.askdirectory(title=title)
-    root.destroy()
-    return folder
+    return filedialog.askdirectory(parent=get_tk_root(), title=title)
 
 def main():
+    get_tk_root()
     log_file = os.path.join(os.getcwd(), "folder_action_log.txt")
     excel_file = os.path.join(os.getcwd(), "loop_system_iso.xlsx")
     
@@ -17,7 +17,7 @@
                     "aa-bb-uvw-mno-pqr(aa-bb-pqr).pdf").
  
  Author:          Akshay Solanki
- Dependencies:    pandas, openpyxl, os
+ Dependencies:    pandas, openpyxl, python-calamine (optional), os
  Created On:      19-Oct-2025
 ===============================================================================
 """
@@ -25,6 +25,16 @@
 import os
 import pandas as pd
 
+# python-calamine (Rust) reads .xlsx far faster than openpyxl; fall back if absent
+# or if pandas is too old (< 2.2) to know engine="calamine"
+try:
+    import python_calamine  # noqa: F401
+    if tuple(int(part) for part in pd.__version__.split(".")[:2]) < (2, 2):
+        raise ImportError("pandas < 2.2 has no calamine engine")
+    EXCEL_READ_ENGINE = "calamine"
+except ImportError:
+    EXCEL_READ_ENGINE = "openpyxl"
+
 # === CONFIGURATION ===
 FOLDER_PATH = r"D:\ISO_Files"  # 🔹 Change this to your working folder path
 EXCEL_FILE = os.path.join(FOLDER_PATH, "summary.xlsx")
@@ -34,13 +44,12 @@ VALID_EXT = ".pdf"  # 🔸 Change to ".iso" if you’re processing ISO drawings
 # ---------------------------------------------------------------------------
 # Helper: Extract shortened name
 # ---------------------------------------------------------------------------
-def get_short_name(filename: str) -> str:
-    """Extracts short name (first two + last part) from a hyphen-separated filename."""
-    name = os.path.splitext(filename)[0]
-    parts = name.split('-')
-    if len(parts) < 3:
-        return name
-    return '-'.join([parts[0], parts[1], parts[-1]])
+def get_short_names(filenames: pd.Series) -> pd.Series:
+    """Extracts short names (first two + last part) from hyphen-separated filenames."""
+    names = filenames.str.rsplit('.', n=1).str[0]
+    parts = names.str.split('-')
+    short = parts.str[0] + '-' + parts.str[1] + '-' + parts.str[-1]
+    return short.where(parts.str.len() >= 3, names)
 
 
 # ---------------------------------------------------------------------------
@@ -48,13 +57,14 @@ def get_short_name(filename: str) -> str:
 # ---------------------------------------------------------------------------
 def generate_or_update_summary() -> pd.DataFrame:
     """Scans folder, creates or updates summary Excel with new/deleted entries."""
-    files = [
-        f for f in os.listdir(FOLDER_PATH)
-        if os.path.isfile(os.path.join(FOLDER_PATH, f)) and f.lower().endswith(VALID_EXT)
-    ]
+    with os.scandir(FOLDER_PATH) as entries:
+        files = [e.name for e in entries if e.name.lower().endswith(VALID_EXT) and e.is_file()]
 
-    new_data = [{"Current Filename": f, "Shortened Name": get_short_name(f), "Last Processed Name": ""} for f in files]
-    new_df = pd.DataFrame(new_data)
+    new_df = pd.DataFrame({
+        "Current Filename": files,
+        "Shortened Name": get_short_names(pd.Series(files, dtype=str)),
+        "Last Processed Name": "",
+    })
 
     if not os.path.exists(EXCEL_FILE):
         new_df.to_excel(EXCEL_FILE, index=False)
@@ -62,18 +72,17 @@ def generate_or_update_summary() -> pd.DataFrame:
         print("👉 Review and edit 'Shortened Name' column if needed, then rerun for rename.")
         return pd.DataFrame()
 
-    old_df = pd.read_excel(EXCEL_FILE)
+    old_df = pd.read_excel(EXCEL_FILE, engine=EXCEL_READ_ENGINE)
     merged = pd.merge(new_df, old_df, on="Current Filename", how="left", suffixes=("", "_old"))
 
     merged["Shortened Name"] = merged["Shortened Name_old"].combine_first(merged["Shortened Name"])
     merged["Last Processed Name"] = merged["Last Processed Name_old"].combine_first(merged["Last Processed Name"])
     merged = merged[["Current Filename", "Shortened Name", "Last Processed Name"]]
 
-    # Remove deleted files
-    missing = set(old_df["Current Filename"]) - set(files)
-    if missing:
-        print(f"⚠️ Removing {len(missing)} entries for deleted files.")
-        merged = merged[~merged["Current Filename"].isin(missing)]
+    # Deleted files already drop out of the left merge; just report them
+    deleted = old_df.loc[~old_df["Current Filename"].isin(new_df["Current Filename"]), "Current Filename"]
+    if not deleted.empty:
+        print(f"⚠️ Removing {deleted.nunique()} entries for deleted files.")
 
     merged.to_excel(EXCEL_FILE, index=False)
     print("✅ Excel summary updated with all files.")
@@ -90,7 +99,7 @@ def rename_changed_files():
         print("⚠️ No summary found. Run script once to generate it first.")
         return
 
-    df = pd.read_excel(EXCEL_FILE)
+    df = pd.read_excel(EXCEL_FILE, dtype=str, engine=EXCEL_READ_ENGINE)
     changed = df[(df["Shortened Name"] != df["Last Processed Name"]) | (df["Last Processed Name"].isna())]
 
     if changed.empty:
@@ -103,14 +112,19 @@ def rename_changed_files():
         print("🚫 Rename operation cancelled by user.")
         return
 
-    for idx, row in changed.iterrows():
-        current_filename = str(row["Current Filename"]).strip()
-        short = str(row["Shortened Name"]).strip()
+    # Collect results during the loop and write them back to df once at the end
+    dropped = []
+    renamed = {}
+    processed = {}
+    rows = changed[["Current Filename", "Shortened Name"]].itertuples(index=True, name=None)
+    for idx, current_filename, short in rows:
+        current_filename = str(current_filename).strip()
+        short = str(short).strip()
         old_path = os.path.join(FOLDER_PATH, current_filename)
 
         if not os.path.exists(old_path):
             print(f"⚠️ File not found: {current_filename}. Removing entry.")
-            df.drop(idx, inplace=True)
+            dropped.append(idx)
             continue
 
         name_no_ext, ext = os.path.splitext(current_filename)
@@ -123,17 +137,22 @@ def rename_changed_files():
         new_path = os.path.join(FOLDER_PATH, new_name)
 
         if new_name == current_filename:
-            df.at[idx, "Last Processed Name"] = short
+            processed[idx] = short
             continue
 
         try:
             os.rename(old_path, new_path)
             print(f"✅ Renamed: {current_filename} → {new_name}")
-            df.at[idx, "Current Filename"] = new_name
-            df.at[idx, "Last Processed Name"] = short
+            renamed[idx] = new_name
+            processed[idx] = short
         except Exception as e:
             print(f"❌ Error renaming {current_filename}: {e}")
 
+    if renamed:
+        df.loc[list(renamed), "Current Filename"] = list(renamed.values())
+    if processed:
+        df.loc[list(processed), "Last Processed Name"] = list(processed.values())
+    df = df.drop(index=dropped)
     df.to_excel(EXCEL_FILE, index=False)
     print("\n📝 Rename operation completed and Excel updated.")
 
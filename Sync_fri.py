@@ -22,8 +22,12 @@
 """
 
 import os
+import sys
+import errno
+import ctypes
 import shutil
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
 # ==============================
@@ -31,8 +35,179 @@ from tqdm import tqdm
 # ==============================
 source_dir = r"\\in-nayra-fs\Nayara\Piping\PIPING FRI"
 destination_dir = r"Z:\PIPING FRI"
+MAX_WORKERS = 8          # Files copied in parallel (hides network latency)
 # ==============================
 
+COPY_CHUNK = 1 << 30     # Max bytes per copy_file_range / sendfile call
+COPY_BUFSIZE = 1 << 20   # 1 MiB buffer for the plain read/write fallback
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                         errno.ENOTSUP, errno.ENOTSOCK, errno.EBADF, errno.EPERM}
+
+def copy_fd(src_fd, dst_fd, size):
+    """
+    Copies file data between two open descriptors inside the kernel where
+    possible: copy_file_range (reflink / server-side copy), then sendfile,
+    then a 1 MiB read/write loop.
+    """
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                n = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK)
+                if n == 0:
+                    break
+                offset += n
+            if offset or not size:
+                return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while True:
+                n = os.sendfile(dst_fd, src_fd, offset, COPY_CHUNK)
+                if n == 0:
+                    break
+                offset += n
+            if offset >= size:
+                return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buf = bytearray(COPY_BUFSIZE)
+    view = memoryview(buf)
+    while True:
+        n = os.readv(src_fd, [buf])
+        if n == 0:
+            break
+        written = 0
+        while written < n:
+            written += os.write(dst_fd, view[written:n])
+
+def _copy_file2(src, dest):
+    """Native Windows copy (CoW / SMB server-side copy). Returns False on failure."""
+    copy_file2 = getattr(ctypes.windll.kernel32, "CopyFile2", None)
+    if copy_file2 is None:
+        return False
+    copy_file2.argtypes = (ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_void_p)
+    copy_file2.restype = ctypes.c_long
+    return copy_file2(os.path.abspath(src), os.path.abspath(dest), None) == 0
+
+def fast_copy(src, dest):
+    """
+    Drop-in for shutil.copy2 that avoids moving the bytes through Python.
+    Keeps the source modification time so the next sync sees it as up-to-date.
+    """
+    if sys.platform == "win32":
+        if not _copy_file2(src, dest):
+            shutil.copy2(src, dest)
+        return
+    st = os.stat(src)
+    cloexec = getattr(os, "O_CLOEXEC", 0)
+    src_fd = os.open(src, os.O_RDONLY | cloexec)
+    try:
+        dst_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | cloexec, st.st_mode & 0o777)
+        try:
+            copy_fd(src_fd, dst_fd, st.st_size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+def scan_tree(root, dirs=None):
+    """
+    Lists every file under root in one pass and returns
+    {relative path: modification time}. If a set is passed as dirs, the
+    relative path of every subfolder found is added to it.
+    Uses os.scandir, so on Windows the times come from the directory listing
+    itself and no per-file stat round-trip is made against the share.
+    On POSIX the walk goes through os.fwalk instead (see scan_tree_fwalk).
+    Returns an empty dict if root does not exist yet.
+    """
+    if hasattr(os, "fwalk"):
+        return scan_tree_fwalk(root, dirs)
+    files = {}
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        try:
+            with os.scandir(os.path.join(root, relative_dir)) as entries:
+                for entry in entries:
+                    relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            pending.append(relative_path)
+                            if dirs is not None:
+                                dirs.add(relative_path)
+                        continue
+                    try:
+                        files[relative_path] = entry.stat().st_mtime
+                    except OSError:
+                        pass
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # An unreadable subfolder (e.g. access denied on the share) is skipped, not fatal
+            print(f"⚠️ Skipped folder (cannot read): {os.path.join(root, relative_dir)} - {e}")
+    return files
+
+def scan_tree_fwalk(root, dirs=None):
+    """
+    POSIX version of scan_tree with the same result. os.fwalk keeps each
+    folder open, so every file is stat'ed relative to its folder's fd
+    instead of resolving the full path from root again.
+    Symlinked subfolders are not followed, as in scan_tree.
+    """
+    def skip_unreadable(error):
+        # Same as scan_tree: a missing root is empty, an unreadable folder is skipped
+        if not isinstance(error, FileNotFoundError):
+            print(f"⚠️ Skipped folder (cannot read): {error}")
+
+    files = {}
+    # fwalk refuses to enter a symlinked top folder, so resolve it first
+    real_root = os.path.realpath(root)
+    try:
+        for folder, _, names, folder_fd in os.fwalk(real_root, onerror=skip_unreadable):
+            relative_dir = os.path.relpath(folder, real_root)
+            if relative_dir == os.curdir:
+                relative_dir = ""
+            elif dirs is not None:
+                dirs.add(relative_dir)
+            for name in names:
+                relative_path = os.path.join(relative_dir, name) if relative_dir else name
+                try:
+                    files[relative_path] = os.stat(name, dir_fd=folder_fd).st_mtime
+                except OSError:
+                    pass
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        skip_unreadable(e)
+    return files
+
+def ensure_dir(path, ensured_dirs):
+    """
+    Creates path once. ensured_dirs remembers it and all of its parents,
+    so files sharing a folder skip the makedirs/stat calls.
+    """
+    if path in ensured_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    while path not in ensured_dirs:
+        ensured_dirs.add(path)
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+def copy_file(source_file, destination_file, ensured_dirs):
+    """Copies a single file, creating its destination subfolder if needed."""
+    ensure_dir(os.path.dirname(destination_file), ensured_dirs)
+    fast_copy(source_file, destination_file)
+
 def sync_directories(source, destination):
     """
     Synchronizes all files from source to destination.
@@ -40,30 +215,45 @@ def sync_directories(source, destination):
     """
     print(f"\n🔄 Sync started at {datetime.now()}\n")
     
-    all_files = []
-    for root, dirs, files in os.walk(source):
-        for file in files:
-            all_files.append((root, file))
+    # Read the metadata of both trees up front, then decide in memory
+    source_files = scan_tree(source)
+    print(f"📦 Found {len(source_files)} files to check in source folder.\n")
+    destination_dirs = set()
+    destination_files = scan_tree(destination, destination_dirs)
+    # Folders that already exist never need a makedirs call
+    ensured_dirs = {os.path.join(destination, d) for d in destination_dirs}
+    if os.path.isdir(destination):
+        ensured_dirs.add(destination)
     
-    print(f"📦 Found {len(all_files)} files to check in source folder.\n")
+    # Copy if new or updated
+    to_copy = []
+    for relative_path, source_mtime in source_files.items():
+        destination_mtime = destination_files.get(relative_path)
+        if destination_mtime is None or source_mtime > destination_mtime:
+            to_copy.append(relative_path)
+        else:
+            tqdm.write(f"⚠️ Skipped (up-to-date): {relative_path}")
     
-    for root, file in tqdm(all_files, desc="Syncing files", unit="file"):
-        source_file = os.path.join(root, file)
-        relative_path = os.path.relpath(source_file, source)
-        destination_file = os.path.join(destination, relative_path)
-        
-        # Ensure destination subfolder exists
-        destination_subdir = os.path.dirname(destination_file)
-        if not os.path.exists(destination_subdir):
-            os.makedirs(destination_subdir)
+    # Folder by folder, so consecutive copies share their parent directories
+    to_copy.sort(key=os.path.dirname)
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {
+            pool.submit(copy_file,
+                        os.path.join(source, relative_path),
+                        os.path.join(destination, relative_path),
+                        ensured_dirs): relative_path
+            for relative_path in to_copy
+        }
         
-        # Copy if new or updated
-        if (not os.path.exists(destination_file) or
-            os.path.getmtime(source_file) > os.path.getmtime(destination_file)):
-            shutil.copy2(source_file, destination_file)
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Syncing files", unit="file"):
+            relative_path = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                tqdm.write(f"❌ Failed: {relative_path} ({e})")
+                continue
             tqdm.write(f"✅ Copied: {relative_path}")
-        else:
-            tqdm.write(f"⚠️ Skipped (up-to-date): {relative_path}")
     
     print(f"\n✅ Sync completed at {datetime.now()}\n")
 
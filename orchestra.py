@@ -5,64 +5,173 @@
  Description:     Runs 7 interconnected processes using external index and caching.
  Author:          Akshay Solanki (Compiled Final Version with Fixes)
  Created on:      21-Oct-2025
- Dependencies:    pandas, openpyxl, tkinter, tqdm, fitz, PyPDF2, re, hashlib, json
+ Dependencies:    pandas, openpyxl, python-calamine (optional), tkinter, tqdm, fitz, pikepdf, re, hashlib, json
 ===============================================================================
 """
 
 import os
+import io
+import sys
+import errno
+import ctypes
+import atexit
 import shutil
 import pandas as pd
 import re
 import hashlib
+import argparse
 from datetime import datetime
-from collections import defaultdict
+from bisect import bisect_right
+from collections import defaultdict, deque
+from contextlib import contextmanager
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
 from tqdm import tqdm
 import time
 import fitz        # Used for P6 PDF merging and content hashing
-import PyPDF2    # Used for P3 simple page extraction
+import pikepdf   # Used for P3 page extraction (QPDF)
 import json
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+# python-calamine (Rust) reads .xlsx far faster than openpyxl; fall back if absent
+# or if pandas is too old (< 2.2) to know engine="calamine"
+try:
+    import python_calamine  # noqa: F401
+    if tuple(int(part) for part in pd.__version__.split(".")[:2]) < (2, 2):
+        raise ImportError("pandas < 2.2 has no calamine engine")
+    EXCEL_READ_ENGINE = "calamine"
+except ImportError:
+    EXCEL_READ_ENGINE = "openpyxl"
 
 # --- GLOBAL CONSTANTS ---
 LOG_FILE = os.path.join(os.getcwd(), "orchestrator_log.txt")
 ERROR_REPORT = os.path.join(os.getcwd(), "error_report.txt")
 P4_CACHE_FILE = os.path.join(os.getcwd(), "linewise_index_cache.json")
+STATE_FILE = os.path.join(os.getcwd(), ".orchestrator_state.json")  # last dialog selections
+P3_CACHE_DIR = os.path.join(os.getcwd(), "page_cache")
 P6_CACHE_NAME = ".merge_cache.json"
 PDF_INDEX_REFERENCE_NAME = "PDF_TOC_Reference.txt"
+WORKFLOW_MARKER_NAME = ".workflow_complete.json"  # written to the workspace root after P7
 OUTPUT_EXCEL_NAME = "output.xlsx" # System-level Excel file name
 FINAL_PDF_SUFFIX = ".pdf"
+FRI_PDF_SUFFIX = "_fri.pdf"
+COPY_WORKERS = 8  # Parallel file copies; overlaps network latency on the shares
+P3_MAX_PENDING_WRITES = 8  # Pages built but not yet written, per P3 worker (caps memory)
+COPY_CHUNK = 1 << 30  # Max bytes per copy_file_range / sendfile call
+COPY_BUFSIZE = 1 << 20  # 1 MiB buffer for the plain read/write fallback
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                         errno.ENOTSUP, errno.ENOTSOCK, errno.EBADF, errno.EPERM}
+
+# Compiled once at import; shared by the phases below
+ISO_PDF_PATTERN = re.compile(r'\(([^)]+)\)\.pdf$', re.IGNORECASE)   # P2: "...(AB-100-X1).pdf"
+PARENTHESES_PATTERN = re.compile(r"\(([^)]+)\)")                    # P4: first "(...)" in a name
+PAGE_PDF_PATTERN = re.compile(r'^\d+\.pdf$')                         # P5: extracted pages "12.pdf"
 
 # --- UTILITY FUNCTIONS ---
+# Both logs stay open for the whole run (buffered), instead of one open() per line
+_LOG_FH = None
+_ERR_FH = None
+_ERROR_COUNT = 0  # log_error calls this run; the workflow marker needs 0
+
+def open_log(path, mode="a"):
+    fh = open(path, mode, encoding="utf-8", buffering=65536)
+    atexit.register(fh.close)
+    return fh
+
+def flush_logs():
+    for fh in (_LOG_FH, _ERR_FH):
+        if fh is not None:
+            fh.flush()
+
 def log_msg(msg):
+    global _LOG_FH
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{timestamp}] {msg}"
     print(line)
     try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
+        if _LOG_FH is None:
+            _LOG_FH = open_log(LOG_FILE)
+        _LOG_FH.write(line + "\n")
     except Exception as e:
         print(f"ERROR logging: {e}")
 
 def log_error(msg):
-    with open(ERROR_REPORT, "a", encoding="utf-8") as f:
-        f.write(msg + "\n")
-
-def select_folder(title):
-    root = tk.Tk()
-    root.withdraw()
-    folder = filedialog.askdirectory(title=title)
-    root.destroy()
-    return folder
-
-def select_file(title, filetypes):
-    root = tk.Tk()
-    root.withdraw()
-    file = filedialog.askopenfilename(title=title, filetypes=filetypes)
-    root.destroy()
-    return file
+    global _ERR_FH, _ERROR_COUNT
+    if _ERR_FH is None:
+        _ERR_FH = open_log(ERROR_REPORT)
+    _ERR_FH.write(msg + "\n")
+    _ERROR_COUNT += 1
+
+_TK_ROOT = None
+_UNATTENDED = False  # --yes: message boxes are logged and confirmations auto-answered
+
+def get_tk_root():
+    # One hidden Tk interpreter, reused by every dialog and message box
+    global _TK_ROOT
+    if _TK_ROOT is None:
+        _TK_ROOT = tk.Tk()
+        _TK_ROOT.withdraw()
+        atexit.register(_TK_ROOT.destroy)
+    return _TK_ROOT
+
+def select_folder(title, last_path=None):
+    # Opens at last run's choice, if it still exists
+    options = {}
+    if last_path and os.path.isdir(last_path):
+        options["initialdir"] = last_path
+    return filedialog.askdirectory(parent=get_tk_root(), title=title, **options)
+
+def select_file(title, filetypes, last_path=None):
+    options = {}
+    if last_path and os.path.isfile(last_path):
+        options["initialdir"], options["initialfile"] = os.path.split(last_path)
+    return filedialog.askopenfilename(parent=get_tk_root(), title=title, filetypes=filetypes, **options)
+
+def show_info(title, message):
+    if _UNATTENDED:
+        log_msg(f"{title}: {message}")
+    else:
+        messagebox.showinfo(title, message, parent=get_tk_root())
+
+def show_error(title, message):
+    if _UNATTENDED:
+        log_msg(f"ERROR - {title}: {message}")
+    else:
+        messagebox.showerror(title, message, parent=get_tk_root())
+
+def ask_yes_no(title, message, default=True):
+    # Unattended runs take the default answer instead of blocking on a dialog
+    if _UNATTENDED:
+        log_msg(f"{title}: {'yes' if default else 'no'} (--yes)")
+        return default
+    return messagebox.askyesno(title, message, parent=get_tk_root(),
+                               default=messagebox.YES if default else messagebox.NO)
+
+def load_last_selections():
+    try:
+        with open(STATE_FILE, 'r', encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_last_selections(selections):
+    try:
+        with open(STATE_FILE, 'w', encoding="utf-8") as f:
+            json.dump(selections, f, indent=2)
+    except OSError as e:
+        log_msg(f"ERROR saving dialog selections: {e}")
+
+@contextmanager
+def timed_phase(phase_times, name):
+    # Records the wall time of the enclosed phase, in ns, under phase_times[name]
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        phase_times[name] = time.perf_counter_ns() - start
 
 def format_time(seconds):
     hrs = int(seconds // 3600)
@@ -70,46 +179,258 @@ def format_time(seconds):
     secs = int(seconds % 60)
     return f"{hrs:02d}:{mins:02d}:{secs:02d}"
 
+def list_subdirs(root):
+    # Direct child folders of root as DirEntry objects (one scandir, types cached)
+    try:
+        with os.scandir(root) as it:
+            return [e for e in it if e.is_dir()]
+    except OSError:
+        return []
+
+def list_file_names(folder):
+    # Names of the plain files in folder; scandir types, no isfile() stat per name
+    with os.scandir(folder) as it:
+        return [e.name for e in it if e.is_file()]
+
+def list_files(folder):
+    # Plain files directly in folder as DirEntry objects; [] if unreadable
+    try:
+        with os.scandir(folder) as it:
+            return [e for e in it if e.is_file()]
+    except OSError:
+        return []
+
+class DirCache:
+    """
+    Lists each workspace folder once for the whole P2-P7 run. Phases report
+    the files they write or delete through add()/discard(), so later phases
+    see the current contents without another directory read on the share.
+    """
+    def __init__(self):
+        self._subdirs = {}   # root -> [DirEntry of child folders]
+        # folder -> {name: lower-cased name, or None for non-files}, in listing
+        # order; the lower-case form is built once here for every phase to use
+        self._entries = {}
+        # folder -> {lower-cased file name: number of files with it}, for
+        # has_file (the Windows shares ignore case, as os.path.exists did)
+        self._lower_counts = {}
+
+    def _load(self, folder):
+        entries = self._entries.get(folder)
+        if entries is None:
+            with os.scandir(folder) as it:
+                entries = {e.name: e.name.lower() if e.is_file() else None for e in it}
+            self._entries[folder] = entries
+            counts = defaultdict(int)
+            for lower in entries.values():
+                if lower is not None:
+                    counts[lower] += 1
+            self._lower_counts[folder] = counts
+        return entries
+
+    def subdirs(self, root):
+        # By name, so every phase walks the workspace in the same directory order
+        if root not in self._subdirs:
+            self._subdirs[root] = sorted(list_subdirs(root), key=lambda e: e.name)
+        return self._subdirs[root]
+
+    def file_names(self, folder):
+        return [name for name, lower in self._load(folder).items() if lower is not None]
+
+    def files_lower(self, folder):
+        """[(name, name.lower())] for the files in folder."""
+        return [(name, lower) for name, lower in self._load(folder).items() if lower is not None]
+
+    def has_file(self, folder, name):
+        # Case-insensitive: "Output.xlsx" or "12.PDF" count as present
+        self._load(folder)
+        return self._lower_counts[folder].get(name.lower(), 0) > 0
+
+    def is_empty(self, folder):
+        return not self._load(folder)
+
+    def add(self, folder, name):
+        if folder in self._entries:
+            if self._entries[folder].get(name) is None:
+                self._lower_counts[folder][name.lower()] += 1
+            self._entries[folder][name] = name.lower()
+
+    def discard(self, folder, name):
+        if folder in self._entries:
+            lower = self._entries[folder].pop(name, None)
+            if lower is not None:
+                self._lower_counts[folder][lower] -= 1
+
+def iter_files(root):
+    # Recursive file walk like os.walk (symlinked folders are not descended)
+    pending = [root]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for e in it:
+                    if e.is_dir():
+                        if not e.is_symlink():
+                            pending.append(e.path)
+                    else:
+                        yield e
+        except OSError:
+            pass
+
 # --- PROCESS 1: ISO MANAGER ---
-def safe_copy(src, dest):
-    if not os.path.exists(src):
-        raise FileNotFoundError(src)
-    dest_dir = os.path.dirname(dest)
-    os.makedirs(dest_dir, exist_ok=True)
-    base, ext = os.path.splitext(dest)
-    if os.path.exists(dest) and os.path.getsize(src) == os.path.getsize(dest):
+def _copy_file2(src, dest):
+    """Native Windows copy (CoW / SMB server-side copy). Returns False on failure."""
+    copy_file2 = getattr(ctypes.windll.kernel32, "CopyFile2", None)
+    if copy_file2 is None:
+        return False
+    copy_file2.argtypes = (ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_void_p)
+    copy_file2.restype = ctypes.c_long
+    return copy_file2(os.path.abspath(src), os.path.abspath(dest), None) == 0
+
+def copy_fd(src_fd, dst_fd, size):
+    """
+    Copies file data between two open descriptors inside the kernel where
+    possible: copy_file_range (reflink / server-side copy), then sendfile,
+    then a 1 MiB read/write loop. Same helper as Sync_fri.py.
+    """
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                n = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK)
+                if n == 0:
+                    break
+                offset += n
+            if offset or not size:
+                return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while True:
+                n = os.sendfile(dst_fd, src_fd, offset, COPY_CHUNK)
+                if n == 0:
+                    break
+                offset += n
+            if offset >= size:
+                return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buf = bytearray(COPY_BUFSIZE)
+    view = memoryview(buf)
+    while True:
+        n = os.readv(src_fd, [buf])
+        if n == 0:
+            break
+        written = 0
+        while written < n:
+            written += os.write(dst_fd, view[written:n])
+
+def fast_copy(src, dest, src_stat=None):
+    """
+    Drop-in for shutil.copy2 that avoids moving the bytes through Python:
+    CopyFile2 on Windows, copy_fd elsewhere. Keeps the source modification
+    time so copy_if_changed sees the copy as up to date.
+    """
+    if sys.platform == "win32":
+        if not _copy_file2(src, dest):
+            shutil.copy2(src, dest)
+        return
+    st = src_stat or os.stat(src)
+    cloexec = getattr(os, "O_CLOEXEC", 0)
+    src_fd = os.open(src, os.O_RDONLY | cloexec)
+    try:
+        dst_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | cloexec, st.st_mode & 0o777)
+        try:
+            copy_fd(src_fd, dst_fd, st.st_size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+def ensure_dir(path, ensured_dirs=None):
+    # makedirs once per directory; ensured_dirs remembers it and its parents
+    if ensured_dirs is None:
+        os.makedirs(path, exist_ok=True)
+        return
+    if path in ensured_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    while path not in ensured_dirs:
+        ensured_dirs.add(path)
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+def safe_copy(src, dest, ensured_dirs=None):
+    # One stat per side; a missing src raises FileNotFoundError as before
+    src_stat = os.stat(src)
+    ensure_dir(os.path.dirname(dest), ensured_dirs)
+    try:
+        if os.stat(dest).st_size == src_stat.st_size:
+            return dest
+    except FileNotFoundError:
+        fast_copy(src, dest, src_stat)
         return dest
-    candidate = dest
+    base, ext = os.path.splitext(dest)
     i = 1
+    candidate = f"{base}_dup{i}{ext}"
     while os.path.exists(candidate):
-        candidate = f"{base}_dup{i}{ext}"
         i += 1
-    shutil.copy2(src, candidate)
+        candidate = f"{base}_dup{i}{ext}"
+    fast_copy(src, candidate, src_stat)
     return candidate
 
-def make_folder_name(loop_no: str, system_no: str) -> str:
-    return f"{str(loop_no).strip()}_{str(system_no).strip()}"
+def make_folder_names(loop_no: pd.Series, system_no: pd.Series) -> pd.Series:
+    return loop_no.str.strip().str.cat(system_no.str.strip(), sep="_")
 
-def find_iso_on_server(iso_no: str, server_path: str) -> str:
-    if not iso_no or not isinstance(iso_no, str):
-        return ""
-    iso_no = iso_no.strip()
-    if os.path.isdir(server_path):
-        try:
-            for item in os.listdir(server_path):
-                if item.lower().endswith(FINAL_PDF_SUFFIX):
-                    if "(" in item and ")" in item:
-                        start = item.rfind("(")
-                        end = item.rfind(")")
-                        if start < end:
-                            extracted = item[start+1:end]
-                            if extracted.lower() == iso_no.lower():
-                                full_path = os.path.join(server_path, item)
-                                if os.path.isfile(full_path):
-                                    return full_path
-        except PermissionError:
-            pass
-    return ""
+def build_iso_index(server_path: str) -> dict:
+    # One directory scan: ISO no (text in the last parentheses, lower-cased) -> full path
+    # e.g. filename(abc-def).pdf -> {"abc-def": ".../filename(abc-def).pdf"}
+    index = {}
+    try:
+        with os.scandir(server_path) as entries:
+            for entry in entries:
+                item = entry.name
+                if not item.lower().endswith(FINAL_PDF_SUFFIX):
+                    continue
+                start = item.rfind("(")
+                end = item.rfind(")")
+                if -1 < start < end and entry.is_file():
+                    index.setdefault(item[start+1:end].lower(), entry.path)
+    except OSError:
+        pass
+    return index
+
+# Main Excel parsed earlier in this run: path -> ((size, mtime_ns), DataFrame)
+_EXCEL_MEMO = {}
+
+def file_signature(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+def read_master_excel(excel_file):
+    """
+    Reads the main Excel as strings, blanks as "". The frame parsed earlier in
+    this run is reused while the file's size and mtime are unchanged, so edits
+    made between steps (e.g. while the dialogs are open) are still picked up.
+    """
+    signature = file_signature(excel_file)
+    memo = _EXCEL_MEMO.get(excel_file)
+    if memo is not None and memo[0] == signature:
+        return memo[1].copy()
+    df = pd.read_excel(excel_file, dtype=str, engine=EXCEL_READ_ENGINE).fillna("")
+    _EXCEL_MEMO[excel_file] = (signature, df.copy())
+    return df
+
+def remember_master_excel(excel_file, df):
+    # Call right after writing df to excel_file
+    _EXCEL_MEMO[excel_file] = (file_signature(excel_file), df.copy())
 
 def create_or_update_excel(excel_file):
     headers = ["Iso no", "loop no", "system no", "folder name", "history folder name", "ISO Status"]
@@ -117,72 +438,101 @@ def create_or_update_excel(excel_file):
         df = pd.DataFrame(columns=headers)
         df.to_excel(excel_file, index=False)
         log_msg(f"Created Excel: {excel_file}")
-        messagebox.showinfo("Excel Created", f"Fill first three columns and save.")
+        show_info("Excel Created", f"Fill first three columns and save.")
         return False
-    df = pd.read_excel(excel_file, dtype=str).fillna("")
+    original = read_master_excel(excel_file)
+    df = original.copy()
     for col in headers:
         if col not in df.columns:
             df[col] = ""
     df = df[headers]
-    for idx, row in df.iterrows():
-        new_folder_name = make_folder_name(row["loop no"], row["system no"])
-        df.at[idx, "folder name"] = new_folder_name
-        if not row["history folder name"]:
-            df.at[idx, "history folder name"] = new_folder_name
-    df.to_excel(excel_file, index=False)
+    df["folder name"] = make_folder_names(df["loop no"], df["system no"])
+    df["history folder name"] = df["history folder name"].mask(df["history folder name"] == "", df["folder name"])
+    # Already normalized (e.g. saved by the last run's P1): leave the file alone
+    if not df.equals(original):
+        df.to_excel(excel_file, index=False)
+        remember_master_excel(excel_file, df)
     return True
 
-def highlight_missing_iso(excel_file):
-    try:
-        wb = load_workbook(excel_file)
-        ws = wb.active
-        red_fill = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
-        clear_fill = PatternFill(fill_type=None)
-        header = [cell.value for cell in ws[1]]
-        if "ISO Status" not in header:
-            return
-        col_idx = header.index("ISO Status") + 1
-        for row in range(2, ws.max_row + 1):
-            cell = ws.cell(row=row, column=col_idx)
-            status_val = str(cell.value).strip().upper() if cell.value else ""
-            fill = red_fill if status_val == "MISSING" else clear_fill
-            for c in range(1, ws.max_column + 1):
-                ws.cell(row=row, column=c).fill = fill
-        wb.save(excel_file)
-    except Exception as e:
-        log_msg(f"ERROR highlighting: {e}")
+# Built once and shared by every styled cell
+RED_FILL = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
+HEADER_FONT = Font(bold=True)
+
+def save_excel_with_highlight(df, excel_file):
+    # Single streamed write (openpyxl write-only mode): MISSING rows get the
+    # red fill as they are written, so the file is never reopened to style it.
+    if "ISO Status" in df.columns:
+        missing = (df["ISO Status"].str.strip().str.upper() == "MISSING").tolist()
+    else:
+        missing = [False] * len(df)
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = HEADER_FONT
+        header.append(cell)
+    ws.append(header)
+    
+    for values, is_missing in zip(df.itertuples(index=False, name=None), missing):
+        values = [v if v != "" else None for v in values]
+        if is_missing:
+            cells = []
+            for v in values:
+                cell = WriteOnlyCell(ws, value=v)
+                cell.fill = RED_FILL
+                cells.append(cell)
+            values = cells
+        ws.append(values)
+    
+    wb.save(excel_file)
+    log_msg(f"Excel saved: {excel_file} ({sum(missing)} MISSING rows highlighted)")
 
 def iso_manager(excel_file, server_path, dest_root):
-    process_start = time.time()
+    process_start = time.perf_counter()
     log_msg("=== P1: ISO MANAGER START ===")
     
-    df = pd.read_excel(excel_file, dtype=str).fillna("")
-    for idx, row in df.iterrows():
-        df.at[idx, "folder name"] = make_folder_name(row["loop no"], row["system no"])
+    df = read_master_excel(excel_file)
+    df["folder name"] = make_folder_names(df["loop no"], df["system no"])
 
     processed_folders = {}
-    for idx, row in df.iterrows():
-        desired = row["folder name"].strip()
-        history = row["history folder name"].strip()
+    history_remap = {}
+    history_updates = {}
+    # Workspace folders known to exist; each one is created at most once
+    ensured_dirs = set()
+    rows = df[["folder name", "history folder name"]].itertuples(index=True, name=None)
+    for idx, desired, history in rows:
+        desired = desired.strip()
+        history = history.strip()
         if not desired or not history:
             continue
         key = (history, desired)
         if key in processed_folders:
-            df.at[idx, "history folder name"] = desired
+            history_updates[idx] = desired
             continue
         desired_path = os.path.join(dest_root, desired)
         history_path = os.path.join(dest_root, history)
         try:
-            if history != desired and os.path.exists(history_path):
-                if not os.path.exists(desired_path):
+            moved = False
+            if history != desired:
+                # Try the rename and let the OS say which case this is, rather than stat both paths first
+                try:
                     os.rename(history_path, desired_path)
                     log_msg(f"RENAMED: {history} -> {desired}")
-                else:
+                    moved = True
+                except FileNotFoundError:
+                    pass  # no history folder left to move
+                except OSError as e:
+                    # Desired folder already exists (EEXIST on Windows, ENOTEMPTY on POSIX): merge into it
+                    if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                        raise
+                    moved = True
                     for f_name in os.listdir(history_path):
                         srcf = os.path.join(history_path, f_name)
                         dstf = os.path.join(desired_path, f_name)
                         if os.path.exists(dstf) and os.path.isfile(srcf):
-                            safe_copy(srcf, dstf)
+                            safe_copy(srcf, dstf, ensured_dirs)
                             try:
                                 os.remove(srcf)
                             except OSError:
@@ -193,98 +543,239 @@ def iso_manager(excel_file, server_path, dest_root):
                         os.rmdir(history_path)
                     except OSError:
                         pass
-                df.loc[df["history folder name"] == history, "history folder name"] = desired
+            if moved:
+                history_remap[history] = desired
                 processed_folders[key] = True
-            if not os.path.exists(desired_path):
-                os.makedirs(desired_path, exist_ok=True)
-            df.at[idx, "history folder name"] = desired
+                ensured_dirs.discard(history_path)
+            if desired_path not in ensured_dirs:
+                try:
+                    os.mkdir(desired_path)
+                except FileExistsError:
+                    pass
+                ensured_dirs.add(desired_path)
+            history_updates[idx] = desired
         except Exception as e:
             log_msg(f"ERROR row {idx}: {e}")
             log_error(f"P1 ERROR row {idx}: {e}")
 
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="[P1] Copying ISOs", ncols=80):
-        iso_no = row["Iso no"].strip()
-        folder = row["folder name"].strip()
+    if history_updates:
+        df.loc[list(history_updates), "history folder name"] = list(history_updates.values())
+    # Point any remaining rows at renamed folders in one pass
+    if history_remap:
+        df["history folder name"] = df["history folder name"].replace(history_remap)
+
+    iso_index = build_iso_index(server_path)
+    iso_status = {}
+    # Rows sharing the same destination file are copied once
+    copy_jobs = {}
+    rows = df[["Iso no", "folder name"]].itertuples(index=True, name=None)
+    for idx, iso_no, folder in rows:
+        iso_no = iso_no.strip()
+        folder = folder.strip()
         dest_folder = os.path.join(dest_root, folder)
         if not folder or not iso_no:
             continue
-        src_iso = find_iso_on_server(iso_no, server_path)
+        src_iso = iso_index.get(iso_no.lower(), "")
         if not src_iso:
-            os.makedirs(dest_folder, exist_ok=True)
-            df.at[idx, "ISO Status"] = "MISSING"
+            ensure_dir(dest_folder, ensured_dirs)
+            iso_status[idx] = "MISSING"
             log_error(f"P1: MISSING ISO {iso_no}")
             continue
         dest_iso = os.path.join(dest_folder, os.path.basename(src_iso))
-        try:
-            safe_copy(src_iso, dest_iso)
-            df.at[idx, "ISO Status"] = "OK"
-        except Exception as e:
-            log_msg(f"ERROR copying {iso_no}: {e}")
-            log_error(f"P1: ERROR copying {iso_no}: {e}")
-            df.at[idx, "ISO Status"] = "MISSING"
+        copy_jobs.setdefault(dest_iso, (src_iso, iso_no, []))[2].append(idx)
+
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        # Submitted folder by folder, so consecutive copies share their directory
+        futures = {pool.submit(safe_copy, src_iso, dest_iso, ensured_dirs): (iso_no, idxs)
+                   for dest_iso, (src_iso, iso_no, idxs) in sorted(copy_jobs.items())}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="[P1] Copying ISOs", ncols=80):
+            iso_no, idxs = futures[future]
+            try:
+                future.result()
+                status = "OK"
+            except Exception as e:
+                log_msg(f"ERROR copying {iso_no}: {e}")
+                log_error(f"P1: ERROR copying {iso_no}: {e}")
+                status = "MISSING"
+            for idx in idxs:
+                iso_status[idx] = status
 
-    df.to_excel(excel_file, index=False)
-    highlight_missing_iso(excel_file)
-    elapsed = time.time() - process_start
+    if iso_status:
+        df.loc[list(iso_status), "ISO Status"] = list(iso_status.values())
+    save_excel_with_highlight(df, excel_file)
+    remember_master_excel(excel_file, df)
+    elapsed = time.perf_counter() - process_start
     log_msg(f"=== P1: ISO MANAGER END ({format_time(elapsed)}) ===\n")
+    return df
 
 # --- PROCESS 2: GENERATE EXCEL ---
-def generate_excel(dest_root):
-    process_start = time.time()
+def generate_excel(dest_root, dir_cache=None):
+    """
+    Writes each folder's output.xlsx. Returns {folder path: ISO LIST values}
+    for every folder whose list is known here, so P3 can skip re-reading it.
+    """
+    process_start = time.perf_counter()
+    if dir_cache is None:
+        dir_cache = DirCache()
     log_msg("=== P2: GENERATE EXCEL START ===")
-    pdf_pattern = re.compile(r'\(([^)]+)\)\.pdf$', re.IGNORECASE)
     processed = 0
+    folder_isos = {}
     
     # CRITICAL FIX: Only process direct children of dest_root
-    for root, dirs, _ in os.walk(dest_root):
-        if root == dest_root:
-            for dir_name in tqdm(dirs, desc="[P2] Generating Excel", ncols=80):
-                subdir = os.path.join(root, dir_name)
-                excel_path = os.path.join(subdir, OUTPUT_EXCEL_NAME)
-                iso_set = set()
+    for folder in tqdm(dir_cache.subdirs(dest_root), desc="[P2] Generating Excel", ncols=80):
+        subdir = folder.path
+        excel_path = os.path.join(subdir, OUTPUT_EXCEL_NAME)
+        has_excel = dir_cache.has_file(subdir, OUTPUT_EXCEL_NAME)
+        iso_set = set()
                 
-                pdf_files = [f for f in os.listdir(subdir) if f.lower().endswith(FINAL_PDF_SUFFIX)]
+        pdf_files = [f for f, f_lower in dir_cache.files_lower(subdir) if f_lower.endswith(FINAL_PDF_SUFFIX)]
                 
-                for file in pdf_files:
-                    match = pdf_pattern.search(file)
-                    if match:
-                        parenthesis_content = match.group(1)
-                        segments = parenthesis_content.split('-')
-                        if len(segments) >= 2:
-                            iso = f"{segments[0].strip()}-{segments[1].strip()}"
-                            iso_set.add(iso)
+        for file in pdf_files:
+            match = ISO_PDF_PATTERN.search(file)
+            if match:
+                parenthesis_content = match.group(1)
+                segments = parenthesis_content.split('-')
+                if len(segments) >= 2:
+                    iso = f"{segments[0].strip()}-{segments[1].strip()}"
+                    iso_set.add(iso)
                 
-                if iso_set:
-                    existing_iso = set()
-                    if os.path.exists(excel_path):
-                        try:
-                            # Read existing ISOs only if file exists
-                            df_existing = pd.read_excel(excel_path, dtype=str).fillna("")
-                            existing_iso = set(df_existing.get("ISO LIST", pd.Series()).dropna().astype(str))
-                        except Exception as e:
-                            log_error(f"P2: Error reading existing Excel in {subdir}: {e}")
+        if iso_set:
+            existing_iso = set()
+            if has_excel:
+                try:
+                    # Read existing ISOs only if file exists
+                    df_existing = pd.read_excel(excel_path, dtype=str, engine=EXCEL_READ_ENGINE).fillna("")
+                    existing_iso = set(df_existing.get("ISO LIST", pd.Series()).dropna().astype(str))
+                except Exception as e:
+                    log_error(f"P2: Error reading existing Excel in {subdir}: {e}")
                             
-                    new_isos = [iso for iso in sorted(iso_set) if iso not in existing_iso]
+            new_isos = [iso for iso in sorted(iso_set) if iso not in existing_iso]
                     
-                    if new_isos or not os.path.exists(excel_path):
-                        df_new = pd.DataFrame({"ISO LIST": new_isos})
-                        if existing_iso and os.path.exists(excel_path):
-                            # Retain any non-ISO LIST columns from existing file if it exists
-                            df_final = pd.concat([df_existing.filter(items=["ISO LIST"]), df_new], ignore_index=True).drop_duplicates()
-                        else:
-                            df_final = df_new
+            if new_isos or not has_excel:
+                df_new = pd.DataFrame({"ISO LIST": new_isos})
+                if existing_iso:
+                    # Retain any non-ISO LIST columns from existing file if it exists
+                    df_final = pd.concat([df_existing.filter(items=["ISO LIST"]), df_new], ignore_index=True).drop_duplicates()
+                else:
+                    df_final = df_new
                         
-                        df_final.to_excel(excel_path, index=False)
-                        processed += 1
-                        log_msg(f"Updated Excel: {subdir}")
-                # Note on Empty Directory Handling (Error 7): Folders without PDFs are correctly skipped.
+                df_final.to_excel(excel_path, index=False)
+                dir_cache.add(subdir, OUTPUT_EXCEL_NAME)
+                folder_isos[subdir] = df_final["ISO LIST"].tolist()
+                processed += 1
+                log_msg(f"Updated Excel: {subdir}")
+            elif existing_iso:
+                folder_isos[subdir] = df_existing["ISO LIST"].tolist()
+        # Note on Empty Directory Handling (Error 7): Folders without PDFs are correctly skipped.
     
-    elapsed = time.time() - process_start
+    elapsed = time.perf_counter() - process_start
     log_msg(f"=== P2: GENERATE EXCEL END ({format_time(elapsed)}) - {processed} folders ===\n")
+    return folder_isos
 
 # --- PROCESS 3: EXTRACT PAGES (EXTERNAL INDEX) ---
-def extract_pages(dest_root, pdf_path, page_index_excel):
-    process_start = time.time()
+# Master PDF for P3 worker processes; opened on first cache miss, then kept
+_P3_SOURCE_PATH = None
+_P3_SOURCE_PDF = None
+
+def open_p3_source(pdf_path):
+    global _P3_SOURCE_PATH
+    _P3_SOURCE_PATH = pdf_path
+
+def get_p3_source():
+    global _P3_SOURCE_PDF
+    if _P3_SOURCE_PDF is None:
+        _P3_SOURCE_PDF = pikepdf.Pdf.open(_P3_SOURCE_PATH)
+    return _P3_SOURCE_PDF
+
+def get_page_cache_dir(pdf_path):
+    """
+    Folder under P3_CACHE_DIR holding the pages already extracted from this
+    version of the master PDF: <hash of path>/<hash of size and mtime>.
+    Older versions of the same master PDF are removed; caches of other PDFs
+    (another run from this folder) are left alone.
+    Delete P3_CACHE_DIR by hand to clear everything.
+    """
+    st = os.stat(pdf_path)
+    source_dir = os.path.join(P3_CACHE_DIR, hashlib.sha256(os.path.abspath(pdf_path).encode()).hexdigest()[:16])
+    version = hashlib.sha256(f"{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()[:16]
+    cache_dir = os.path.join(source_dir, version)
+    os.makedirs(cache_dir, exist_ok=True)
+    for entry in list_subdirs(source_dir):
+        if entry.name != version:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return cache_dir
+
+def store_extracted_page(output_path, cached_path, data):
+    # Writes one rendered page to the workspace and publishes it to the page cache
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    # Publish atomically: other workers may want the same page
+    tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cached_path)
+    except OSError:
+        pass  # the cache is only an optimisation
+
+def extract_folder_pages(subdir, pages, cache_dir):
+    """
+    Writes <page>.pdf into subdir for each (page number, ISO) in pages. A page
+    already in cache_dir is copied from there; otherwise it is extracted from
+    the master PDF and stored in the cache for the next folder or run.
+    Pages are built in memory here while a small writer pool saves the
+    previous ones, so building and writing to the share overlap. At most
+    P3_MAX_PENDING_WRITES pages wait for the writers at any time.
+    Runs in a worker process, so errors are returned to the parent for
+    logging rather than written here.
+    Returns ([names of files written], cache hits, [error messages]).
+    """
+    written = []
+    hits = 0
+    errors = []
+    cached_names = set(list_file_names(cache_dir))
+
+    def collect(future, page_num, iso, from_cache):
+        nonlocal hits
+        try:
+            future.result()
+        except Exception as e:
+            errors.append(f"P3: Error extracting page {page_num} for ISO {iso}: {e}")
+            return
+        written.append(f"{page_num}{FINAL_PDF_SUFFIX}")
+        hits += from_cache
+
+    with ThreadPoolExecutor(max_workers=2) as writer:
+        pending = deque()
+        for page_num, iso in pages:
+            # Wait for the oldest write before building more, so one large
+            # folder does not hold all of its pages in memory
+            if len(pending) >= P3_MAX_PENDING_WRITES:
+                collect(*pending.popleft())
+            page_name = f"{page_num}{FINAL_PDF_SUFFIX}"
+            output_path = os.path.join(subdir, page_name)
+            cached_path = os.path.join(cache_dir, page_name)
+            if page_name in cached_names:
+                pending.append((writer.submit(fast_copy, cached_path, output_path), page_num, iso, True))
+                continue
+            try:
+                buffer = io.BytesIO()
+                with pikepdf.Pdf.new() as out:
+                    out.pages.append(get_p3_source().pages[page_num - 1])
+                    out.save(buffer, compress_streams=True,
+                             object_stream_mode=pikepdf.ObjectStreamMode.generate)
+            except Exception as e:
+                errors.append(f"P3: Error extracting page {page_num} for ISO {iso}: {e}")
+                continue
+            pending.append((writer.submit(store_extracted_page, output_path, cached_path, buffer.getvalue()), page_num, iso, False))
+        while pending:
+            collect(*pending.popleft())
+    return written, hits, errors
+
+def extract_pages(dest_root, pdf_path, page_index_excel, dir_cache=None, folder_isos=None):
+    process_start = time.perf_counter()
+    if dir_cache is None:
+        dir_cache = DirCache()
     log_msg("=== P3: EXTRACT PAGES START (Reading External Index) ===")
     
     if not os.path.exists(pdf_path):
@@ -300,7 +791,7 @@ def extract_pages(dest_root, pdf_path, page_index_excel):
     # 1. BUILD GLOBAL ISO -> PAGE MAP from the Master Index Excel
     iso_page_map = {}
     try:
-        master_df = pd.read_excel(page_index_excel, dtype=str).fillna("")
+        master_df = pd.read_excel(page_index_excel, dtype=str, engine=EXCEL_READ_ENGINE).fillna("")
         if 'ISO LIST' not in master_df.columns or 'PDF PAGE' not in master_df.columns:
             log_msg("ERROR: Master Index Excel requires columns 'ISO LIST' and 'PDF PAGE'. Skipping P3.")
             log_error("P3: Master Index Excel format error.")
@@ -322,80 +813,131 @@ def extract_pages(dest_root, pdf_path, page_index_excel):
     # 2. PERFORM EXTRACTION
     extracted = 0
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_path)
-        total_pages = len(pdf_reader.pages)
+        with pikepdf.Pdf.open(pdf_path) as source_pdf:
+            total_pages = len(source_pdf.pages)
     except Exception as e:
         log_msg(f"ERROR: Cannot read Master PDF {e}")
         log_error(f"P3: Cannot read Master PDF {e}")
         return
     
+    # Work out each folder's missing pages first, then extract them on the pool
+    page_jobs = {}
     # CRITICAL FIX: Only process direct children of dest_root
-    for root, dirs, _ in os.walk(dest_root):
-        if root == dest_root:
-            for dir_name in tqdm(dirs, desc="[P3] Extracting Pages", ncols=80):
-                subdir = os.path.join(root, dir_name)
-                excel_path = os.path.join(subdir, OUTPUT_EXCEL_NAME)
+    for folder in tqdm(dir_cache.subdirs(dest_root), desc="[P3] Reading ISO lists", ncols=80):
+        subdir = folder.path
+        excel_path = os.path.join(subdir, OUTPUT_EXCEL_NAME)
+        # ISO list handed over by P2, else read back from the folder's Excel
+        iso_entries = folder_isos.get(subdir) if folder_isos else None
                 
-                if not os.path.exists(excel_path):
-                    continue
+        if iso_entries is None and not dir_cache.has_file(subdir, OUTPUT_EXCEL_NAME):
+            continue
                 
-                try:
-                    # CRITICAL FIX: Improved error handling for reading the system Excel
-                    system_df = pd.read_excel(excel_path, dtype=str)
-                    if "ISO LIST" not in system_df.columns:
-                        log_error(f"P3: 'ISO LIST' column missing in {excel_path}. Skipping folder.")
-                        continue
+        try:
+            if iso_entries is None:
+                # CRITICAL FIX: Improved error handling for reading the system Excel
+                system_df = pd.read_excel(excel_path, dtype=str, engine=EXCEL_READ_ENGINE)
+                if "ISO LIST" not in system_df.columns:
+                    log_error(f"P3: 'ISO LIST' column missing in {excel_path}. Skipping folder.")
+                    continue
+                iso_entries = system_df["ISO LIST"].dropna()
                     
-                    for iso_list_entry in system_df["ISO LIST"].dropna():
-                        iso = str(iso_list_entry).strip().upper()
-                        if not iso:
-                            continue
+            # Collect the folder's pages first (page -> first ISO asking for it), then write each once
+            wanted_pages = {}
+            for iso_list_entry in iso_entries:
+                iso = str(iso_list_entry).strip().upper()
+                if not iso:
+                    continue
                         
-                        pages_str = iso_page_map.get(iso, "")
+                pages_str = iso_page_map.get(iso, "")
                         
-                        if pages_str:
-                            for p in pages_str.split(','):
-                                p = p.strip()
-                                if p.isdigit():
-                                    page_num = int(p)
+                if pages_str:
+                    for p in pages_str.split(','):
+                        p = p.strip()
+                        if p.isdigit():
+                            page_num = int(p)
                                     
-                                    if 1 <= page_num <= total_pages:
-                                        output_path = os.path.join(subdir, f"{page_num}{FINAL_PDF_SUFFIX}")
-                                        if not os.path.exists(output_path):
-                                            try:
-                                                pdf_writer = PyPDF2.PdfWriter()
-                                                pdf_writer.add_page(pdf_reader.pages[page_num - 1]) 
-                                                with open(output_path, 'wb') as f:
-                                                    pdf_writer.write(f)
-                                                extracted += 1
-                                            except Exception as e:
-                                                log_error(f"P3: Error extracting page {page_num} for ISO {iso}: {e}")
-                                    else:
-                                        log_error(f"P3: Invalid page number {page_num} for ISO {iso} (Total pages: {total_pages}).")
+                            if 1 <= page_num <= total_pages:
+                                wanted_pages.setdefault(page_num, iso)
+                            else:
+                                log_error(f"P3: Invalid page number {page_num} for ISO {iso} (Total pages: {total_pages}).")
+            
+            # Pages already extracted on an earlier run are known from the folder listing
+            missing_pages = [(page_num, iso) for page_num, iso in sorted(wanted_pages.items())
+                             if not dir_cache.has_file(subdir, f"{page_num}{FINAL_PDF_SUFFIX}")]
+            if missing_pages:
+                page_jobs[subdir] = missing_pages
+        except Exception as e:
+            log_error(f"P3: Error processing {subdir} or system Excel: {e}")
+
+    cache_hits = 0
+    if page_jobs:
+        cache_dir = get_page_cache_dir(pdf_path)
+        # Folders are independent and page writing is CPU-bound, so one process
+        # per core; each worker opens the master PDF at most once
+        with ProcessPoolExecutor(initializer=open_p3_source, initargs=(pdf_path,)) as pool:
+            futures = {pool.submit(extract_folder_pages, subdir, pages, cache_dir): subdir
+                       for subdir, pages in page_jobs.items()}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="[P3] Extracting Pages", ncols=80):
+                subdir = futures[future]
+                try:
+                    written, hits, errors = future.result()
                 except Exception as e:
-                    log_error(f"P3: Error processing {subdir} or system Excel: {e}")
+                    log_error(f"P3: Error extracting pages in {subdir}: {e}")
+                    continue
+                extracted += len(written)
+                cache_hits += hits
+                for name in written:
+                    dir_cache.add(subdir, name)
+                for error in errors:
+                    log_error(error)
     
-    elapsed = time.time() - process_start
-    log_msg(f"=== P3: EXTRACT PAGES END ({format_time(elapsed)}) - {extracted} pages ===\n")
+    elapsed = time.perf_counter() - process_start
+    log_msg(f"=== P3: EXTRACT PAGES END ({format_time(elapsed)}) - {extracted} pages ({cache_hits} from page cache) ===\n")
 
 # --- PROCESS 4: FRICOPY (CACHING) ---
 def extract_name_in_parentheses(filename):
-    match = re.search(r"\(([^)]+)\)", filename)
+    match = PARENTHESES_PATTERN.search(filename)
     return match.group(1).strip() if match else None
 
+# Folder stats already taken in this run: (path, recursive) -> dir_stats result.
+# main() starts each run with an empty dict; phases called on their own get None
+# (no sharing), so a later call never sees a stale walk.
+_DIR_STATS = None
+
+def dir_stats(path, recursive=True):
+    """
+    (PDF count, total size, newest mtime_ns, listing digest) of the PDFs
+    under path. The digest covers every PDF's path, size and mtime, so a
+    rename, move or replaced file changes it even when the totals match.
+    """
+    file_count = total_size = newest = 0
+    listing = []
+    for entry in (iter_files(path) if recursive else list_files(path)):
+        if entry.name.lower().endswith(FINAL_PDF_SUFFIX):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            file_count += 1
+            total_size += st.st_size
+            newest = max(newest, st.st_mtime_ns)
+            listing.append(f"{entry.path}|{st.st_size}|{st.st_mtime_ns}")
+    listing.sort()
+    digest = hashlib.sha256("\n".join(listing).encode("utf-8", "surrogateescape")).hexdigest()
+    return file_count, total_size, newest, digest
+
+def cached_dir_stats(path, recursive=True):
+    # dir_stats, walked once per run; only for folders the run does not write to
+    if _DIR_STATS is None:
+        return dir_stats(path, recursive)
+    key = (path, recursive)
+    if key not in _DIR_STATS:
+        _DIR_STATS[key] = dir_stats(path, recursive)
+    return _DIR_STATS[key]
+
 def get_dir_hash(path):
-    total_size = 0
-    file_count = 0
-    for dirpath, _, filenames in os.walk(path):
-        for f in filenames:
-            full_path = os.path.join(dirpath, f)
-            if f.lower().endswith(FINAL_PDF_SUFFIX): 
-                try:
-                    total_size += os.path.getsize(full_path)
-                    file_count += 1
-                except:
-                    pass
-    return hashlib.sha256(f"{file_count}-{total_size}".encode()).hexdigest()
+    # P4 index cache key: changes when a LINEWISE PDF is added, removed, renamed or moved
+    return cached_dir_stats(path)[3]
 
 def create_linewise_index_cached(root_path):
     current_hash = get_dir_hash(root_path)
@@ -407,7 +949,7 @@ def create_linewise_index_cached(root_path):
             
             if cache_data.get('hash') == current_hash:
                 log_msg("Loaded P4 index from cache (LINEWISE unchanged).")
-                indexed = {k: [(p, n) for p, n in v] for k, v in cache_data.get('index', {})}
+                indexed = {k: [(p, n) for p, n in v] for k, v in cache_data.get('index', {}).items()}
                 return indexed
             else:
                 log_msg("P4 index cache invalid (LINEWISE changed or structure mismatch). Rebuilding...")
@@ -415,12 +957,12 @@ def create_linewise_index_cached(root_path):
             log_msg(f"ERROR loading cache: {e}. Rebuilding...")
 
     linewise_index = defaultdict(list)
-    for subdir, _, files in tqdm(os.walk(root_path), desc="[P4] Building Index", ncols=80, leave=False):
-        for linewise_file in files:
-            if linewise_file.lower().endswith(FINAL_PDF_SUFFIX):
-                search_key = os.path.splitext(linewise_file)[0].lower()
-                full_path = os.path.join(subdir, linewise_file)
-                linewise_index[search_key].append((full_path, linewise_file))
+    for entry in tqdm(iter_files(root_path), desc="[P4] Building Index", ncols=80, leave=False):
+        linewise_file = entry.name
+        name_lower = linewise_file.lower()
+        if name_lower.endswith(FINAL_PDF_SUFFIX):
+            search_key = os.path.splitext(name_lower)[0]
+            linewise_index[search_key].append((entry.path, linewise_file))
 
     try:
         cache_index = {k: [[p, n] for p, n in v] for k, v in linewise_index.items()}
@@ -432,8 +974,51 @@ def create_linewise_index_cached(root_path):
         
     return linewise_index
 
-def fricopy(backup_root, linewise_root):
-    process_start = time.time()
+def make_key_finder(keys):
+    """
+    Returns find(needle) -> [keys containing needle], in the order given.
+    The keys are joined into one NUL-separated string (NUL cannot occur in a
+    file name), so a lookup is a few C-level str.find calls rather than a
+    Python substring test against every key.
+    """
+    keys = list(keys)
+    starts = []
+    pos = 0
+    for key in keys:
+        starts.append(pos)
+        pos += len(key) + 1
+    haystack = "\0".join(keys)
+
+    def find(needle):
+        found = []
+        i = haystack.find(needle)
+        while i != -1:
+            k = bisect_right(starts, i) - 1
+            found.append(keys[k])
+            # Resume at the next key so each key is reported once
+            i = haystack.find(needle, starts[k] + len(keys[k]) + 1)
+        return found
+    return find
+
+def copy_if_changed(src, dest):
+    # Copies unless dest already exists with the same size and is not older
+    # than src (copies keep src's mtime; 2 s slack covers coarse share clocks).
+    # One stat per side. True if copied.
+    src_st = os.stat(src)
+    try:
+        dest_st = os.stat(dest)
+    except FileNotFoundError:
+        dest_st = None
+    if (dest_st is not None and dest_st.st_size == src_st.st_size
+            and src_st.st_mtime <= dest_st.st_mtime + 2):
+        return False
+    fast_copy(src, dest, src_st)
+    return True
+
+def fricopy(backup_root, linewise_root, dir_cache=None):
+    process_start = time.perf_counter()
+    if dir_cache is None:
+        dir_cache = DirCache()
     log_msg("=== P4: FRICOPY START (Using Cached Index) ===")
     
     linewise_index = create_linewise_index_cached(linewise_root)
@@ -444,42 +1029,58 @@ def fricopy(backup_root, linewise_root):
     
     all_backup_files = []
     # CRITICAL FIX: Only process direct children of dest_root
-    for root, dirs, _ in os.walk(backup_root):
-        if root == backup_root:
-            for dir_name in dirs:
-                subdir = os.path.join(root, dir_name)
-                for file in os.listdir(subdir):
-                    if file.lower().endswith(FINAL_PDF_SUFFIX) and not file.lower().endswith("_fri.pdf"):
-                        all_backup_files.append((subdir, file))
+    for folder in dir_cache.subdirs(backup_root):
+        subdir = folder.path
+        for file, file_lower in dir_cache.files_lower(subdir):
+            if file_lower.endswith(FINAL_PDF_SUFFIX) and not file_lower.endswith(FRI_PDF_SUFFIX):
+                all_backup_files.append((subdir, file))
 
-    copied = 0
-    for subdir, file in tqdm(all_backup_files, desc="[P4] Creating FRI copies", ncols=80):
+    # Match first (pure Python), then hand the copies to the pool.
+    # Keyed by target path: if two sources map to one target, the last one wins as before.
+    fri_jobs = {}
+    find_keys = make_key_finder(linewise_index)
+    keys_by_name = {}  # the same name recurs across folders; search it once
+    for subdir, file in all_backup_files:
         base_name = extract_name_in_parentheses(file)
         if not base_name:
             continue
         base_name_lower = base_name.lower()
         
-        for linewise_key, linewise_entries in linewise_index.items():
-            if base_name_lower in linewise_key:
-                for full_path, lw_file in linewise_entries:
-                    target_filename = os.path.splitext(lw_file)[0] + "_FRI.pdf"
-                    target_path = os.path.join(subdir, target_filename)
-                    if not os.path.exists(target_path) or os.path.getsize(full_path) != os.path.getsize(target_path):
-                        try:
-                            shutil.copy2(full_path, target_path)
-                            copied += 1
-                        except Exception as e:
-                            log_error(f"P4: Error copying FRI: {e}")
-    
-    elapsed = time.time() - process_start
+        matched_keys = keys_by_name.get(base_name_lower)
+        if matched_keys is None:
+            matched_keys = keys_by_name[base_name_lower] = find_keys(base_name_lower)
+        for linewise_key in matched_keys:
+            for full_path, lw_file in linewise_index[linewise_key]:
+                target_filename = os.path.splitext(lw_file)[0] + "_FRI.pdf"
+                fri_jobs[(subdir, target_filename)] = full_path
+
+    copied = 0
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        futures = {pool.submit(copy_if_changed, full_path, os.path.join(subdir, target_filename)): (subdir, target_filename)
+                   for (subdir, target_filename), full_path in sorted(fri_jobs.items())}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="[P4] Creating FRI copies", ncols=80):
+            try:
+                copied += future.result()
+            except Exception as e:
+                log_error(f"P4: Error copying FRI: {e}")
+                continue
+            dir_cache.add(*futures[future])
+    
+    elapsed = time.perf_counter() - process_start
     log_msg(f"=== P4: FRICOPY END ({format_time(elapsed)}) - {copied} copies ===\n")
 
 # --- PROCESS 5: CLEANUP REDUNDANCY ---
-def cleanup_redundancy(dest_root, excel_file):
-    process_start = time.time()
+def cleanup_redundancy(dest_root, excel_file, dir_cache=None, master_df=None):
+    process_start = time.perf_counter()
+    if dir_cache is None:
+        dir_cache = DirCache()
     log_msg("=== P5: CLEANUP REDUNDANCY START ===")
     
-    df = pd.read_excel(excel_file, dtype=str).fillna("")
+    # P1 passes the main Excel it just saved; read it only when run on its own
+    if master_df is not None:
+        df = master_df
+    else:
+        df = read_master_excel(excel_file)
     folder_iso_map = {}
     for _, row in df.iterrows():
         folder = row["folder name"].strip()
@@ -487,58 +1088,66 @@ def cleanup_redundancy(dest_root, excel_file):
         if folder and iso_no:
             if folder not in folder_iso_map:
                 folder_iso_map[folder] = []
-            folder_iso_map[folder].append(iso_no)
+            folder_iso_map[folder].append(iso_no.lower())
     
-    deleted = 0
-    # CRITICAL FIX: Only process direct children of dest_root (os.listdir is appropriate here)
-    for folder_name in tqdm(os.listdir(dest_root), desc="[P5] Cleaning redundancy", ncols=80):
-        folder_path = os.path.join(dest_root, folder_name)
-        if not os.path.isdir(folder_path):
-            continue
+    # Decide from the listings first (pure Python), then hand the deletes to the pool
+    to_delete = []
+    # CRITICAL FIX: Only process direct children of dest_root
+    for folder in dir_cache.subdirs(dest_root):
+        folder_name = folder.name
+        folder_path = folder.path
         
-        expected_isos = folder_iso_map.get(folder_name, [])
+        expected_isos = folder_iso_map.get(folder_name, [])   # already lower-cased
         if not expected_isos:
             continue
+        final_pdf_name = f"{folder_name.lower()}{FINAL_PDF_SUFFIX}"
         
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if not os.path.isfile(file_path):
-                continue
-            
+        for file_name, name_lower in dir_cache.files_lower(folder_path):
             # Keep the final combined PDF
-            if file_name.lower() == f"{folder_name.lower()}{FINAL_PDF_SUFFIX}":
+            if name_lower == final_pdf_name:
                 continue
 
             belongs = False
             # Check if file name contains any expected ISO
             for iso_no in expected_isos:
-                if iso_no.lower() in file_name.lower():
+                if iso_no in name_lower:
                     belongs = True
                     break
             
             # Check for extracted page PDFs (e.g., '1.pdf', '10.pdf')
-            if re.match(r'^\d+\.pdf$', file_name.lower()):
+            if PAGE_PDF_PATTERN.match(name_lower):
                  belongs = True
             
             # Check for FRI copies
-            if file_name.lower().endswith("_fri.pdf"):
+            if name_lower.endswith(FRI_PDF_SUFFIX):
                 belongs = True
 
             if not belongs:
-                try:
-                    os.remove(file_path)
-                    deleted += 1
-                except Exception as e:
-                    log_error(f"P5: Error deleting {file_name}: {e}")
+                to_delete.append((folder_path, file_name))
+
+    deleted = 0
+    # Each remove is a round-trip on the share; overlap them like the copies
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        futures = {pool.submit(os.remove, os.path.join(folder_path, file_name)): (folder_path, file_name)
+                   for folder_path, file_name in to_delete}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="[P5] Cleaning redundancy", ncols=80):
+            folder_path, file_name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                log_error(f"P5: Error deleting {file_name}: {e}")
+                continue
+            dir_cache.discard(folder_path, file_name)
+            deleted += 1
     
-    elapsed = time.time() - process_start
+    elapsed = time.perf_counter() - process_start
     log_msg(f"=== P5: CLEANUP REDUNDANCY END ({format_time(elapsed)}) - {deleted} deleted ===\n")
 
 # --- PROCESS 6: COMBINE PDF (CUSTOM SORTING & CACHING) ---
 def page_hash(page):
     return hashlib.sha256(page.get_text("xml").encode('utf-8')).hexdigest()
 
-def get_folder_source_hash(folder_path, pdf_files):
+def get_folder_source_hash(folder_path, pdf_files, errors):
     current_hash = hashlib.md5()
     for f in sorted(pdf_files):
         fpath = os.path.join(folder_path, f)
@@ -546,7 +1155,7 @@ def get_folder_source_hash(folder_path, pdf_files):
             with open(fpath, 'rb') as file:
                 current_hash.update(file.read())
         except Exception as e:
-            log_error(f"P6: Error hashing {f}: {e}")
+            errors.append(f"P6: Error hashing {f}: {e}")
             return None 
     return current_hash.hexdigest()
 
@@ -558,125 +1167,171 @@ def get_sort_key(filename):
     base, _ = os.path.splitext(name)
     
     # 1. Numeric PDFs: <0, number> (e.g., 1.pdf, 10.pdf)
-    if re.fullmatch(r'\d+', base):
-        try:
-            return (0, int(base)) 
-        except ValueError:
-            return (99, base)
+    # str.isdecimal() is the C-level equivalent of fullmatch(r'\d+'), and
+    # int() accepts every string it passes
+    if base.isdecimal():
+        return (0, int(base))
 
     # 3. FRI ISO PDFs: <2, filename> (e.g., (123-456)_FRI.pdf)
-    elif name.endswith("_fri.pdf"):
-        return (2, name.replace("_fri.pdf", FINAL_PDF_SUFFIX))
+    elif name.endswith(FRI_PDF_SUFFIX):
+        return (2, name.replace(FRI_PDF_SUFFIX, FINAL_PDF_SUFFIX))
 
     # 2. Main ISO PDFs: <1, filename> (e.g., (123-456).pdf)
     else:
         return (1, name)
 
-def combine_pdfs(dest_root):
-    process_start = time.time()
+def page_runs(page_numbers):
+    # [0, 1, 2, 5, 6] -> [(0, 2), (5, 6)]
+    runs = []
+    for n in page_numbers:
+        if runs and runs[-1][1] == n - 1:
+            runs[-1] = (runs[-1][0], n)
+        else:
+            runs.append((n, n))
+    return runs
+
+def combine_folder(folder_path, dir_name, file_names):
+    """
+    Builds <dir_name>.pdf for one workspace folder from its listed file_names.
+    Runs in a worker process, so errors are returned to the parent for logging
+    rather than written here.
+    Returns ([names of files written], [error messages]).
+    """
+    errors = []
+    written = []
+    output_pdf_path = os.path.join(folder_path, f"{dir_name}{FINAL_PDF_SUFFIX}")
+    cache_file = os.path.join(folder_path, P6_CACHE_NAME)
+    
+    # 1. Filter out the final combined PDF
+    final_pdf_name = f"{dir_name.lower()}{FINAL_PDF_SUFFIX}"
+    pdf_files = [
+        f for f in file_names
+        if (f_lower := f.lower()).endswith(FINAL_PDF_SUFFIX) and f_lower != final_pdf_name and not f.startswith('.')
+    ]
+    
+    if not pdf_files:
+        return written, errors
+
+    # Check for changes (Reconstruction Logic)
+    current_source_hash = get_folder_source_hash(folder_path, pdf_files, errors)
+    
+    if P6_CACHE_NAME in file_names:
+        try:
+            with open(cache_file, 'r') as f:
+                cache_data = json.load(f)
+            
+            if cache_data.get('source_hash') == current_source_hash:
+                return written, errors # Skip reconstruction
+        except:
+            pass
+    
+    # 2. Apply Custom Sort
+    pdf_files.sort(key=get_sort_key)
+    
+    combined_pdf = fitz.open()
+    seen_hashes = set()
+    
+    try:
+        for filename in pdf_files:
+            try:
+                full_file_path = os.path.join(folder_path, filename)
+                with fitz.open(full_file_path) as pdf:
+                    # Deduplication logic: keep pages whose content was not seen yet
+                    keep = []
+                    for page in pdf:
+                        ph = page_hash(page)
+                        if ph not in seen_hashes:
+                            keep.append(page.number)
+                            seen_hashes.add(ph)
+                    # Insert runs of consecutive kept pages in one call each
+                    # (usually the whole file) instead of one call per page
+                    for start, end in page_runs(keep):
+                        combined_pdf.insert_pdf(pdf, from_page=start, to_page=end)
+            except Exception as e:
+                errors.append(f"P6: Error combining {filename}: {e}")
+        
+        # 3. Save the combined file
+        if combined_pdf.page_count > 0:
+            combined_pdf.save(output_pdf_path, garbage=4, deflate=True)
+            written.append(os.path.basename(output_pdf_path))
+            
+            # Update cache
+            try:
+                with open(cache_file, 'w') as f:
+                    json.dump({'source_hash': current_source_hash, 'timestamp': datetime.now().isoformat()}, f)
+                written.append(P6_CACHE_NAME)
+            except Exception as e:
+                errors.append(f"P6: Error writing cache for {dir_name}: {e}")
+    finally:
+        combined_pdf.close()
+    return written, errors
+
+def combine_pdfs(dest_root, dir_cache=None):
+    process_start = time.perf_counter()
+    if dir_cache is None:
+        dir_cache = DirCache()
     log_msg("=== P6: COMBINE PDF START (Using Merge Cache and Custom Sort) ===")
     
     combined = 0
     # CRITICAL FIX: Only process direct children of dest_root
-    for root, dirs, _ in os.walk(dest_root):
-        if root == dest_root:
-            for dir_name in tqdm(dirs, desc="[P6] Combining PDFs", ncols=80):
-                folder_path = os.path.join(root, dir_name)
-                output_pdf_path = os.path.join(folder_path, f"{dir_name}{FINAL_PDF_SUFFIX}")
-                cache_file = os.path.join(folder_path, P6_CACHE_NAME)
-                
-                # 1. Filter out the final combined PDF
-                pdf_files = [
-                    f for f in os.listdir(folder_path) 
-                    if f.lower().endswith(FINAL_PDF_SUFFIX) and f.lower() != f"{dir_name.lower()}{FINAL_PDF_SUFFIX}" and not f.startswith('.')
-                ]
-                
-                if not pdf_files:
-                    continue
-
-                # Check for changes (Reconstruction Logic)
-                current_source_hash = get_folder_source_hash(folder_path, pdf_files)
-                
-                if os.path.exists(cache_file):
-                    try:
-                        with open(cache_file, 'r') as f:
-                            cache_data = json.load(f)
-                        
-                        if cache_data.get('source_hash') == current_source_hash:
-                            continue # Skip reconstruction
-                    except:
-                        pass
-                
-                # 2. Apply Custom Sort
-                pdf_files.sort(key=get_sort_key)
-                
-                combined_pdf = fitz.open()
-                seen_hashes = set()
-                
-                try:
-                    for filename in pdf_files:
-                        try:
-                            full_file_path = os.path.join(folder_path, filename)
-                            with fitz.open(full_file_path) as pdf:
-                                for page in pdf:
-                                    # Deduplication logic
-                                    ph = page_hash(page)
-                                    if ph not in seen_hashes:
-                                        combined_pdf.insert_pdf(pdf, from_page=page.number, to_page=page.number)
-                                        seen_hashes.add(ph)
-                        except Exception as e:
-                            log_error(f"P6: Error combining {filename}: {e}")
-                    
-                    # 3. Save the combined file
-                    if combined_pdf.page_count > 0:
-                        combined_pdf.save(output_pdf_path, garbage=4, deflate=True)
-                        combined += 1
-                        
-                        # Update cache
-                        try:
-                            with open(cache_file, 'w') as f:
-                                json.dump({'source_hash': current_source_hash, 'timestamp': datetime.now().isoformat()}, f)
-                        except Exception as e:
-                            log_error(f"P6: Error writing cache for {dir_name}: {e}")
-                            
-                finally:
-                    if 'combined_pdf' in locals() and combined_pdf:
-                        combined_pdf.close()
+    folders = dir_cache.subdirs(dest_root)
+    # Folders are independent and merging is CPU-bound, so one process per core
+    with ProcessPoolExecutor() as pool:
+        futures = {pool.submit(combine_folder, folder.path, folder.name, dir_cache.file_names(folder.path)): folder
+                   for folder in folders}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="[P6] Combining PDFs", ncols=80):
+            folder = futures[future]
+            try:
+                written, errors = future.result()
+            except Exception as e:
+                log_error(f"P6: Error combining {folder.name}: {e}")
+                continue
+            if written:
+                combined += 1
+            for name in written:
+                dir_cache.add(folder.path, name)
+            for error in errors:
+                log_error(error)
     
-    elapsed = time.time() - process_start
+    elapsed = time.perf_counter() - process_start
     log_msg(f"=== P6: COMBINE PDF END ({format_time(elapsed)}) - {combined} combined ===\n")
 
 # --- PROCESS 7: FINAL CLEANUP + VERIFY ---
-def final_cleanup_and_verify(dest_root, excel_file):
-    process_start = time.time()
+def final_cleanup_and_verify(dest_root, excel_file, dir_cache=None, master_df=None):
+    process_start = time.perf_counter()
+    if dir_cache is None:
+        dir_cache = DirCache()
     log_msg("=== P7: FINAL CLEANUP + ERROR CHECK START ===")
     
-    df = pd.read_excel(excel_file, dtype=str).fillna("")
+    # P1 passes the main Excel it just saved; read it only when run on its own
+    if master_df is not None:
+        df = master_df
+    else:
+        df = read_master_excel(excel_file)
     issues_found = 0
     
-    # CRITICAL FIX: Only process direct children of dest_root (os.listdir is appropriate here)
-    for folder_name in os.listdir(dest_root):
-        folder_path = os.path.join(dest_root, folder_name)
-        if not os.path.isdir(folder_path):
-            continue
-        
-        folder_in_excel = any(df["folder name"] == folder_name)
+    excel_folders = set(df["folder name"])
+    
+    # CRITICAL FIX: Only process direct children of dest_root
+    for entry in dir_cache.subdirs(dest_root):
+        folder_name = entry.name
         
-        # Check for orphaned empty folders not in the main Excel
-        if not folder_in_excel and not os.listdir(folder_path):
+        # Orphaned folders not in the main Excel: rmdir itself refuses non-empty ones
+        if folder_name not in excel_folders:
             try:
-                os.rmdir(folder_path)
+                os.rmdir(entry.path)
                 log_msg(f"Deleted orphaned empty folder: {folder_name}")
-            except:
+            except OSError:
                 pass
         
         # Check for folders in Excel that are now empty (issue)
-        if folder_in_excel and not os.listdir(folder_path):
+        elif dir_cache.is_empty(entry.path):
             log_error(f"P7: Empty folder {folder_name} listed in main Excel.")
             issues_found += 1
     
-    missing_count = len(df[df["ISO Status"] == "MISSING"])
-    ok_count = len(df[df["ISO Status"] == "OK"])
+    status_counts = df["ISO Status"].value_counts()
+    missing_count = int(status_counts.get("MISSING", 0))
+    ok_count = int(status_counts.get("OK", 0))
     
     report = f"""
 ================================================================================
@@ -697,7 +1352,7 @@ All errors logged in: {ERROR_REPORT}
     print(report)
     log_msg(report)
     
-    elapsed = time.time() - process_start
+    elapsed = time.perf_counter() - process_start
     log_msg(f"=== P7: FINAL CLEANUP + ERROR CHECK END ({format_time(elapsed)}) ===\n")
     
     return missing_count, issues_found
@@ -705,14 +1360,80 @@ All errors logged in: {ERROR_REPORT}
 # ============================================================================
 # MAIN ORCHESTRATOR
 # ============================================================================
-def main():
-    master_start = time.time()
+def workflow_signature(excel_file, selections):
+    """
+    Cheap fingerprint of every workflow input: the selected paths, size and
+    mtime of the input files, and dir_stats of the folders (totals plus a
+    digest of every PDF's path, size and mtime), so any replaced, renamed or
+    re-dated PDF counts as a change.
+    The server and LINEWISE folders are only read, so their stats are shared
+    with P4 and walked once per run; the workspace is walked every call.
+    Returns None if an input file cannot be stat'ed (never matches a marker).
+    """
+    signature = {"selections": selections}
+    try:
+        for key in ("pdf_path", "pdf_index_txt", "page_index_excel"):
+            signature[key] = list(file_signature(selections[key]))
+        signature["excel_file"] = [excel_file, *file_signature(excel_file)]
+    except OSError:
+        return None
+    # P1 only takes ISOs from the top level of the server folder
+    signature["server_path"] = list(cached_dir_stats(selections["server_path"], recursive=False))
+    signature["linewise_path"] = list(cached_dir_stats(selections["linewise_path"]))
+    signature["dest_root"] = list(dir_stats(selections["dest_root"]))
+    return signature
+
+def load_workflow_marker(dest_root):
+    try:
+        with open(os.path.join(dest_root, WORKFLOW_MARKER_NAME), 'r', encoding="utf-8") as f:
+            return json.load(f).get("signature")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def save_workflow_marker(dest_root, signature):
+    if signature is None:
+        log_msg("Workflow marker not written: an input file could not be read.")
+        return
+    try:
+        with open(os.path.join(dest_root, WORKFLOW_MARKER_NAME), 'w', encoding="utf-8") as f:
+            json.dump({"signature": signature, "completed_at": datetime.now().isoformat()}, f, indent=2)
+    except OSError as e:
+        log_msg(f"ERROR writing workflow marker: {e}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Runs the 7-process ISO workflow. Any path not given is asked for with a dialog.")
+    parser.add_argument("--yes", action="store_true",
+                        help="run without confirmation or message boxes (an up-to-date workspace is skipped)")
+    parser.add_argument("--server", help="FOLDER 1: Server ISO Folder (Source for P1)")
+    parser.add_argument("--dest", help="FOLDER 2: Destination Root (Workspace)")
+    parser.add_argument("--linewise", help="FOLDER 3: LINEWISE Folder (Source for P4)")
+    parser.add_argument("--pdf", help="FILE 4: Master PDF (Source for P3)")
+    parser.add_argument("--pdf-index", help="FILE 5: PDF Index (.txt) Reference")
+    parser.add_argument("--page-index", help="FILE 6: Master Page Index Excel (ISO to Page Number map for P3)")
+    args = parser.parse_args(argv)
+    # The dialogs only return existing paths; hold CLI paths to the same rule
+    # before P1 touches the master Excel
+    for option, path, is_folder in (("--server", args.server, True), ("--dest", args.dest, True),
+                                    ("--linewise", args.linewise, True), ("--pdf", args.pdf, False),
+                                    ("--pdf-index", args.pdf_index, False), ("--page-index", args.page_index, False)):
+        if path is not None and not (os.path.isdir(path) if is_folder else os.path.isfile(path)):
+            parser.error(f"{option}: {'folder' if is_folder else 'file'} not found: {path}")
+    return args
+
+def main(argv=None):
+    global _LOG_FH, _ERR_FH, _ERROR_COUNT, _UNATTENDED, _DIR_STATS
+    master_start = time.perf_counter()
+    args = parse_args(argv)
+    _UNATTENDED = args.yes
+    _DIR_STATS = {}
     
     # Initialize logs
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write("=== ORCHESTRATOR LOG ===\n\n")
-    with open(ERROR_REPORT, "w", encoding="utf-8") as f:
-        f.write("=== ERROR REPORT ===\n\n")
+    _LOG_FH = open_log(LOG_FILE, "w")
+    _LOG_FH.write("=== ORCHESTRATOR LOG ===\n\n")
+    _ERR_FH = open_log(ERROR_REPORT, "w")
+    _ERR_FH.write("=== ERROR REPORT ===\n\n")
+    _ERROR_COUNT = 0
     
     log_msg("Starting Complete Orchestrator...\n")
     
@@ -727,53 +1448,72 @@ def main():
     print("="*80)
     
     # --- USER INPUT SELECTIONS ---
+    last = load_last_selections()
     print("FOLDER 1: Select the master repository for original ISOs.")
-    server_path = select_folder("FOLDER 1: Server ISO Folder (Source for P1)")
+    server_path = args.server or select_folder("FOLDER 1: Server ISO Folder (Source for P1)", last.get("server_path"))
     if not server_path:
         log_msg("Workflow cancelled: Server ISO Folder not selected.")
         return
     
     print("FOLDER 2: Select the root destination for ALL generated folders/files.")
-    dest_root = select_folder("FOLDER 2: Destination Root (Workspace)")
+    dest_root = args.dest or select_folder("FOLDER 2: Destination Root (Workspace)", last.get("dest_root"))
     if not dest_root:
         log_msg("Workflow cancelled: Destination Root not selected.")
         return
     
     print("FOLDER 3: Select the LINEWISE archive folder (Source for P4/FRI copies).")
-    linewise_path = select_folder("FOLDER 3: LINEWISE Folder (Source for P4)")
+    linewise_path = args.linewise or select_folder("FOLDER 3: LINEWISE Folder (Source for P4)", last.get("linewise_path"))
     if not linewise_path:
         log_msg("Workflow cancelled: LINEWISE Folder not selected.")
         return
     
     print("FILE 4: Select the MASTER PDF file (Source document for page extraction in P3).")
-    pdf_path = select_file("FILE 4: Master PDF (Source for P3)", [("PDF files", "*.pdf")])
+    pdf_path = args.pdf or select_file("FILE 4: Master PDF (Source for P3)", [("PDF files", "*.pdf")], last.get("pdf_path"))
     if not pdf_path:
         log_msg("Workflow cancelled: Master PDF not selected.")
         return
         
     print("**FILE 5: Select the PRE-GENERATED PDF INDEX (.txt file) for user reference.**")
-    pdf_index_txt = select_file("FILE 5: PDF Index (.txt) Reference", [("Text files", "*.txt"), ("All files", "*.*")])
+    pdf_index_txt = args.pdf_index or select_file("FILE 5: PDF Index (.txt) Reference", [("Text files", "*.txt"), ("All files", "*.*")], last.get("pdf_index_txt"))
     if not pdf_index_txt:
         log_msg("Workflow cancelled: PDF Index (.txt) Reference not selected.")
         return
     
     print("**FILE 6: Select the MASTER PAGE INDEX EXCEL file (ISO to Page Number map for P3).**")
-    page_index_excel = select_file("FILE 6: Master Page Index Excel (ISO to Page Number map for P3)", [("Excel files", "*.xlsx")])
+    page_index_excel = args.page_index or select_file("FILE 6: Master Page Index Excel (ISO to Page Number map for P3)", [("Excel files", "*.xlsx")], last.get("page_index_excel"))
     if not page_index_excel:
         log_msg("Workflow cancelled: Master Page Index Excel not selected.")
         return
+    selections = {
+        "server_path": server_path,
+        "dest_root": dest_root,
+        "linewise_path": linewise_path,
+        "pdf_path": pdf_path,
+        "pdf_index_txt": pdf_index_txt,
+        "page_index_excel": page_index_excel,
+    }
+    save_last_selections(selections)
+    
+    # Same inputs and workspace as the last completed run: nothing to redo
+    marker = load_workflow_marker(dest_root)
+    if marker is not None and marker == workflow_signature(excel_file, selections):
+        if not ask_yes_no("Up To Date",
+                          "The workspace is up to date with these inputs (last run completed).\n\n"
+                          "Re-run the workflow anyway?", default=False):
+            log_msg("Workflow skipped: workspace already up to date.")
+            return
         
     # --- Step 1: Copy the .txt index file to the working directory for user convenience ---
     try:
-        shutil.copy2(pdf_index_txt, os.path.join(excel_dir, PDF_INDEX_REFERENCE_NAME))
+        fast_copy(pdf_index_txt, os.path.join(excel_dir, PDF_INDEX_REFERENCE_NAME))
         log_msg(f"Copied PDF Index Reference to: {os.path.join(excel_dir, PDF_INDEX_REFERENCE_NAME)}")
-        messagebox.showinfo("Index Reference Ready", 
-                            f"The PDF Index Reference has been copied to the script folder ({PDF_INDEX_REFERENCE_NAME}).\n\n"
-                            f"Please ensure the Master Page Index Excel ({os.path.basename(page_index_excel)}) has been fully updated "
-                            f"with page numbers from this reference *before* proceeding.")
+        show_info("Index Reference Ready", 
+                  f"The PDF Index Reference has been copied to the script folder ({PDF_INDEX_REFERENCE_NAME}).\n\n"
+                  f"Please ensure the Master Page Index Excel ({os.path.basename(page_index_excel)}) has been fully updated "
+                  f"with page numbers from this reference *before* proceeding.")
     except Exception as e:
         log_msg(f"ERROR copying PDF Index Reference: {e}")
-        messagebox.showerror("Error", f"Failed to copy PDF Index Reference. Please check permissions. Workflow cancelled.")
+        show_error("Error", f"Failed to copy PDF Index Reference. Please check permissions. Workflow cancelled.")
         return
 
     summary = f"""
@@ -789,30 +1529,53 @@ P7: Final Cleanup + Verify
 """
     print(summary)
     
-    if not messagebox.askyesno("Confirm", "Run complete 7-process workflow?"):
+    if not ask_yes_no("Confirm", "Run complete 7-process workflow?"):
         return
     
     # --- EXECUTE WORKFLOW ---
+    phase_times = {}
     try:
-        iso_manager(excel_file, server_path, dest_root)
-        generate_excel(dest_root)
+        with timed_phase(phase_times, "P1: ISO Manager"):
+            master_df = iso_manager(excel_file, server_path, dest_root)
+        flush_logs()
+        # P2-P7 share one listing of each workspace folder
+        dir_cache = DirCache()
+        with timed_phase(phase_times, "P2: Generate Excel"):
+            folder_isos = generate_excel(dest_root, dir_cache)
+        flush_logs()
         
         # P3: Extraction based on external ISO-Page mapping
-        extract_pages(dest_root, pdf_path, page_index_excel)
+        with timed_phase(phase_times, "P3: Extract Pages"):
+            extract_pages(dest_root, pdf_path, page_index_excel, dir_cache, folder_isos)
+        flush_logs()
         
         # P4: Copy FRI documents
-        fricopy(dest_root, linewise_path)
+        with timed_phase(phase_times, "P4: Fricopy"):
+            fricopy(dest_root, linewise_path, dir_cache)
+        flush_logs()
         
         # P5: Delete unnecessary files
-        cleanup_redundancy(dest_root, excel_file)
+        with timed_phase(phase_times, "P5: Cleanup Redundancy"):
+            cleanup_redundancy(dest_root, excel_file, dir_cache, master_df)
+        flush_logs()
         
         # P6: Combine PDFs with custom sorting and caching
-        combine_pdfs(dest_root) 
+        with timed_phase(phase_times, "P6: Combine PDF"):
+            combine_pdfs(dest_root, dir_cache)
+        flush_logs()
         
         # P7: Final checks
-        missing, issues = final_cleanup_and_verify(dest_root, excel_file)
+        with timed_phase(phase_times, "P7: Final Cleanup + Verify"):
+            missing, issues = final_cleanup_and_verify(dest_root, excel_file, dir_cache, master_df)
+        # Only a clean run may let the next identical run be skipped
+        if _ERROR_COUNT:
+            log_msg(f"Workflow marker not written: {_ERROR_COUNT} error(s) in {ERROR_REPORT}.")
+        else:
+            save_workflow_marker(dest_root, workflow_signature(excel_file, selections))
+        flush_logs()
         
-        total_elapsed = time.time() - master_start
+        total_elapsed = time.perf_counter() - master_start
+        phase_table = "\n".join(f"- {name:<28}{ns / 1e9:>10.3f} s" for name, ns in phase_times.items())
         
         result = f"""
 ================================================================================
@@ -822,17 +1585,21 @@ Total Time: {format_time(total_elapsed)}
 Missing ISOs: {missing}
 Issues Found: {issues}
 
+Phase Times:
+{phase_table}
+
 Logs:
 - Main: {LOG_FILE}
 - Errors: {ERROR_REPORT}
 ================================================================================
 """
         print(result)
-        messagebox.showinfo("Success", result)
+        show_info("Success", result)
     except Exception as e:
         log_msg(f"FATAL ERROR in main execution: {e}")
         log_error(f"FATAL: {e}")
-        messagebox.showerror("Error", f"Failed: {e}\n\nCheck error report.")
+        flush_logs()
+        show_error("Error", f"Failed: {e}\n\nCheck error report.")
 
 if __name__ == "__main__":
     main()